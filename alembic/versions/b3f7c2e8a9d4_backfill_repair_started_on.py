@@ -0,0 +1,72 @@
+"""Backfill repair_started_on
+
+Revision ID: b3f7c2e8a9d4
+Revises: 6e2b9d4a7f15
+Create Date: 2026-10-19 19:41:05.512873
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f7c2e8a9d4'
+down_revision: Union[str, Sequence[str], None] = '6e2b9d4a7f15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REPAIR_STATUS_ID = 2
+
+devices = sa.table(
+    'devices',
+    sa.column('devices_id', sa.Integer),
+    sa.column('status_id', sa.Integer),
+    sa.column('repaired_date', sa.Date),
+    sa.column('repair_started_on', sa.Date),
+)
+device_events = sa.table(
+    'device_events',
+    sa.column('seq', sa.Integer),
+    sa.column('devices_id', sa.Integer),
+    sa.column('payload', sa.Text),
+    sa.column('changed_at', sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # repair_started_on is only set by /update-status/ from 5d3c8e1f7b26 on. Every device event
+    # carries the device's status, so the last time a device went into repair is taken from
+    # the events. Devices whose repair began before device_events existed stay NULL.
+    conn = op.get_bind()
+    started, previous = {}, {}
+    rows = conn.execute(
+        sa.select(device_events.c.devices_id, device_events.c.payload, device_events.c.changed_at)
+        .order_by(device_events.c.seq)
+        .execution_options(yield_per=1000)
+    )
+    for devices_id, payload, changed_at in rows:
+        status_id = json.loads(payload).get('status_id') if payload else None
+        if status_id == REPAIR_STATUS_ID and previous.get(devices_id) != REPAIR_STATUS_ID and changed_at is not None:
+            started[devices_id] = changed_at.date()
+        previous[devices_id] = status_id
+
+    ids = list(started)
+    for offset in range(0, len(ids), 500):
+        candidates = conn.execute(
+            sa.select(devices.c.devices_id, devices.c.status_id, devices.c.repaired_date)
+            .where(devices.c.repair_started_on == None, devices.c.devices_id.in_(ids[offset:offset + 500]))
+        ).all()
+        for devices_id, status_id, repaired_date in candidates:
+            # Either still in repair, or the repair that repaired_date closed
+            if status_id == REPAIR_STATUS_ID or (repaired_date is not None and started[devices_id] <= repaired_date):
+                conn.execute(devices.update().where(devices.c.devices_id == devices_id).values(repair_started_on=started[devices_id]))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Backfilled dates cannot be told apart from recorded ones, so they are kept
+    pass
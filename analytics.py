@@ -0,0 +1,286 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from models import SessionLocal, Devices, DeviceEvents, SystemStatus, Divisions, Locations, Parishes, Clients
+from cache import cache
+from replicas import replica_router
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# ANALYTICS_SNAPSHOT=true keeps a columnar copy of the devices table in every worker (needs numpy)
+# and answers the report endpoints from it. Anything older than ANALYTICS_MAX_LAG_SECONDS is
+# treated as stale and the endpoints go back to SQL.
+ANALYTICS_SNAPSHOT = os.getenv("ANALYTICS_SNAPSHOT", "false").lower() in ("1", "true", "yes")
+ANALYTICS_REFRESH_SECONDS = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "5"))
+ANALYTICS_MAX_LAG_SECONDS = float(os.getenv("ANALYTICS_MAX_LAG_SECONDS", "30"))
+ANALYTICS_FULL_REFRESH_SECONDS = float(os.getenv("ANALYTICS_FULL_REFRESH_SECONDS", "3600"))
+
+# Bumped by endpoints that change devices without recording a device event (status/division deletes)
+REFERENCE_TAGS = ("statuses", "divisions", "devices")
+
+NO_ID = -1
+NO_DATE = "NaT"
+TEXT_FIELDS = ["brand", "model", "serial_number", "inventory_number"]
+
+
+def _id(value):
+    return NO_ID if value is None else value
+
+def _objects(values):
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+class DeviceSnapshot:
+    """
+    Columnar copy of the devices table: integer codes for category, status, division,
+    location, parish and client, datetime64 dates and object arrays for the text shown
+    in reports. It is loaded once and then kept current from device_events, so a refresh
+    only reads the devices changed since the last seq it applied.
+    """
+    def __init__(self):
+        self.ready = False
+        self.last_seq = 0
+        self.refreshed_at = None
+        self.loaded_at = None
+        self.tag_versions = None
+        self._lock = threading.Lock()
+
+    # THIS IS THE SECTION THAT LOADS THE SNAPSHOT ###########################################################
+    def _load_reference(self, db):
+        self.status_names = dict(db.query(SystemStatus.status_id, SystemStatus.status_description).all())
+        divisions = db.query(Divisions.division_id, Divisions.division_name, Divisions.location_id).all()
+        self.division_names = {division_id: name for division_id, name, _ in divisions}
+        self.division_location = {division_id: location_id for division_id, _, location_id in divisions}
+        locations = db.query(Locations.location_id, Locations.location_name, Locations.parish_id).order_by(Locations.location_id).all()
+        self.location_names = {location_id: name for location_id, name, _ in locations}
+        self.location_parish = {location_id: parish_id for location_id, _, parish_id in locations}
+        self.parish_names = dict(db.query(Parishes.parish_id, Parishes.parish_name).all())
+        self.client_names = {}
+
+    def _category_code(self, category):
+        code = self.category_codes.get(category)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(category)
+            self.category_codes[category] = code
+        return code
+
+    def _columns(self, devices):
+        location = [_id(self.division_location.get(device.division_id)) for device in devices]
+        return {
+            "devices_id": np.array([device.devices_id for device in devices], dtype=np.int64),
+            "category": np.array([self._category_code(device.category) for device in devices], dtype=np.int32),
+            "status": np.array([_id(device.status_id) for device in devices], dtype=np.int32),
+            "division": np.array([_id(device.division_id) for device in devices], dtype=np.int32),
+            "location": np.array(location, dtype=np.int32),
+            "parish": np.array([_id(self.location_parish.get(location_id)) for location_id in location], dtype=np.int32),
+            "client": np.array([_id(device.client_id) for device in devices], dtype=np.int32),
+            "delivery_date": np.array([device.delivery_date or NO_DATE for device in devices], dtype="datetime64[D]"),
+            "deployment_date": np.array([device.deployment_date or NO_DATE for device in devices], dtype="datetime64[D]"),
+            **{field: _objects([getattr(device, field) for device in devices]) for field in TEXT_FIELDS},
+        }
+
+    def _load_clients(self, db, client_ids):
+        missing = [client_id for client_id in set(client_ids) if client_id is not None and client_id not in self.client_names]
+        if missing:
+            rows = db.query(Clients.client_id, Clients.firstname, Clients.lastname).filter(Clients.client_id.in_(missing)).all()
+            self.client_names.update({client_id: (firstname, lastname) for client_id, firstname, lastname in rows})
+
+    def _full_load(self, db):
+        latest = db.query(DeviceEvents.seq).order_by(DeviceEvents.seq.desc()).first()
+        self._load_reference(db)
+        self.categories = []
+        self.category_codes = {}
+        devices = db.query(Devices).order_by(Devices.devices_id).all()
+        self._load_clients(db, [device.client_id for device in devices])
+
+        self.columns = self._columns(devices)
+        self.live = np.ones(len(devices), dtype=bool)
+        self.index = {devices_id: i for i, devices_id in enumerate(self.columns["devices_id"].tolist())}
+        self.last_seq = latest[0] if latest else 0
+        self.loaded_at = time.monotonic()
+
+    def _apply_changes(self, db):
+        events = (
+            db.query(DeviceEvents.seq, DeviceEvents.devices_id)
+            .filter(DeviceEvents.seq > self.last_seq)
+            .order_by(DeviceEvents.seq)
+            .all()
+        )
+        if not events:
+            return 0
+
+        changed = {devices_id for _, devices_id in events}
+        devices = db.query(Devices).filter(Devices.devices_id.in_(changed)).all()
+        self._load_clients(db, [device.client_id for device in devices])
+
+        # Deleted devices are only masked out; the next full load compacts the arrays
+        for devices_id in changed:
+            if devices_id in self.index:
+                self.live[self.index[devices_id]] = False
+
+        existing = [device for device in devices if device.devices_id in self.index]
+        added = [device for device in devices if device.devices_id not in self.index]
+
+        if existing:
+            rows = np.array([self.index[device.devices_id] for device in existing])
+            for name, values in self._columns(existing).items():
+                self.columns[name][rows] = values
+            self.live[rows] = True
+
+        if added:
+            start = len(self.live)
+            for name, values in self._columns(added).items():
+                self.columns[name] = np.concatenate([self.columns[name], values])
+            self.live = np.concatenate([self.live, np.ones(len(added), dtype=bool)])
+            self.index.update({device.devices_id: start + i for i, device in enumerate(added)})
+
+        self.last_seq = events[-1][0]
+        return len(changed)
+
+    def refresh(self):
+        versions = cache.tags.tag_versions(REFERENCE_TAGS)
+        db = SessionLocal()
+        try:
+            with self._lock:
+                full = (
+                    not self.ready
+                    or versions != self.tag_versions
+                    or time.monotonic() - self.loaded_at > ANALYTICS_FULL_REFRESH_SECONDS
+                )
+                if full:
+                    self._full_load(db)
+                else:
+                    self._apply_changes(db)
+                self.tag_versions = versions
+                self.refreshed_at = time.monotonic()
+                self.ready = True
+        finally:
+            db.close()
+
+    def fresh(self):
+        if not self.ready or time.monotonic() - self.refreshed_at > ANALYTICS_MAX_LAG_SECONDS:
+            return False
+        try:
+            return cache.tags.tag_versions(REFERENCE_TAGS) == self.tag_versions
+        except Exception:
+            return False
+
+    def stats(self):
+        return {
+            "enabled": ANALYTICS_SNAPSHOT and np is not None,
+            "ready": self.ready,
+            "fresh": self.fresh(),
+            "devices": int(self.live.sum()) if self.ready else 0,
+            "last_seq": self.last_seq,
+            "seconds_since_refresh": round(time.monotonic() - self.refreshed_at, 3) if self.ready else None,
+        }
+
+    # THIS IS THE SECTION THAT ANSWERS THE REPORTS ##########################################################
+    def _codes(self, names, lookup):
+        wanted = set(names)
+        return [key for key, name in lookup.items() if name in wanted]
+
+    def _rows(self, mask, fields):
+        rows = np.flatnonzero(mask)
+        values = {}
+        for field in fields:
+            if field in TEXT_FIELDS or field == "devices_id":
+                values[field] = self.columns[field][rows].tolist()
+            elif field == "category":
+                values[field] = [self.categories[code] for code in self.columns["category"][rows].tolist()]
+            elif field in ("delivery_date", "deployment_date"):
+                values[field] = self.columns[field][rows].astype(object).tolist()
+            elif field == "status_description":
+                values[field] = [self.status_names.get(code) for code in self.columns["status"][rows].tolist()]
+            elif field == "division_name":
+                values[field] = [self.division_names.get(code) for code in self.columns["division"][rows].tolist()]
+            elif field == "location_name":
+                values[field] = [self.location_names.get(code) for code in self.columns["location"][rows].tolist()]
+            elif field in ("client_first_name", "client_last_name"):
+                position = 0 if field == "client_first_name" else 1
+                values[field] = [self.client_names.get(code, (None, None))[position] for code in self.columns["client"][rows].tolist()]
+        return [dict(zip(fields, row)) for row in zip(*(values[field] for field in fields))]
+
+    def location_category_counts(self):
+        with self._lock:
+            mask = self.live & np.isin(self.columns["division"], list(self.division_names)) & (self.columns["location"] != NO_ID)
+            width = max(len(self.categories), 1)
+            pairs = self.columns["location"][mask].astype(np.int64) * width + self.columns["category"][mask]
+            keys, counts = np.unique(pairs, return_counts=True)
+
+            by_location = {}
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                location_id, code = divmod(key, width)
+                by_location.setdefault(location_id, []).append({"category": self.categories[code], "count": count})
+
+            return [
+                {"location_name": name, "category_counts": by_location.get(location_id, [])}
+                for location_id, name in self.location_names.items()
+            ]
+
+    def filter_devices(self, filters):
+        with self._lock:
+            mask = self.live.copy()
+            if filters.locations:
+                mask &= np.isin(self.columns["location"], self._codes(filters.locations, self.location_names))
+            if filters.parishes:
+                mask &= np.isin(self.columns["parish"], self._codes(filters.parishes, self.parish_names))
+            if filters.statuses:
+                mask &= np.isin(self.columns["status"], self._codes(filters.statuses, self.status_names))
+            if filters.components:
+                mask &= np.isin(self.columns["category"], [self.category_codes[c] for c in filters.components if c in self.category_codes])
+            return self._rows(mask, [
+                "devices_id", "category", "brand", "model", "serial_number", "inventory_number",
+                "delivery_date", "status_description", "location_name",
+            ])
+
+    def filter_date(self, field, since):
+        with self._lock:
+            mask = (
+                self.live
+                & np.isin(self.columns["division"], list(self.division_names))
+                & np.isin(self.columns["status"], list(self.status_names))
+                & (self.columns[field] >= np.datetime64(since, "D"))
+            )
+            return self._rows(mask, [
+                "devices_id", "category", "brand", "model", "serial_number", "inventory_number",
+                field, "status_description", "division_name",
+            ])
+
+    def filter_status(self, status_id):
+        with self._lock:
+            mask = self.live & (self.columns["status"] == status_id)
+            return self._rows(mask, [
+                "devices_id", "category", "brand", "model", "serial_number", "inventory_number",
+                "delivery_date", "status_description", "division_name", "client_first_name", "client_last_name",
+            ])
+
+
+device_snapshot = DeviceSnapshot()
+
+
+def analytics_enabled():
+    return ANALYTICS_SNAPSHOT and np is not None
+
+# The snapshot to answer from, or None when the caller should use SQL. A user who just
+# wrote reads from SQL for REPLICA_STICKY_SECONDS, like with the read replicas.
+def current_snapshot(user_key=None):
+    if analytics_enabled() and device_snapshot.fresh() and not replica_router.is_sticky(user_key):
+        return device_snapshot
+    return None
+
+async def refresh_snapshot_forever():
+    while True:
+        try:
+            await asyncio.to_thread(device_snapshot.refresh)
+        except Exception as e:
+            logging.error(f"Error refreshing analytics snapshot: {str(e)}")
+        await asyncio.sleep(ANALYTICS_REFRESH_SECONDS)
@@ -0,0 +1,126 @@
+import os
+import asyncio
+import logging
+from datetime import date, timedelta
+from sqlalchemy import select, literal
+from sqlalchemy.exc import IntegrityError
+from models import SessionLocal, Devices, archived_devices, archived_details
+from device_events import record_device_event
+from search import refresh_device_search
+from cache import cache, invalidate_device
+
+# Devices are archived once their bos_date is at least ARCHIVE_AFTER_DAYS old, ARCHIVE_BATCH_SIZE
+# per transaction. ARCHIVE_INTERVAL_SECONDS=0 turns the schedule off, which leaves the
+# /archive-devices/ endpoint and the archive-devices job.
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "0"))
+
+
+class RestoreConflict(Exception):
+    pass
+
+
+# THIS IS THE SECTION THAT MOVES ROWS BETWEEN THE TIERS ###################################################
+# Both directions copy with INSERT ... SELECT and then delete the source rows in the same
+# transaction, so a device is always in exactly one tier.
+
+# Copies the columns both tables share, plus any extra (name -> value) the target needs
+def _move(db, source, target, devices_ids, extra=None):
+    columns = [column.name for column in source.columns if column.name in target.c]
+    rows = select(*[source.c[name] for name in columns], *(extra or {}).values()).where(source.c.devices_id.in_(devices_ids))
+    db.execute(target.insert().from_select(columns + list(extra or {}), rows))
+    db.execute(source.delete().where(source.c.devices_id.in_(devices_ids)))
+
+def archive_devices(db, changed_by, older_than_days=ARCHIVE_AFTER_DAYS, limit=ARCHIVE_BATCH_SIZE):
+    cutoff = date.today() - timedelta(days=older_than_days)
+    # SKIP LOCKED lets workers running the schedule at the same time take different batches
+    devices = (
+        db.query(Devices)
+        .filter(Devices.bos_date != None, Devices.bos_date <= cutoff)
+        .order_by(Devices.devices_id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not devices:
+        return []
+
+    devices_ids = [device.devices_id for device in devices]
+    serial_numbers = [device.serial_number for device in devices]
+    for device in devices:
+        record_device_event(db, device, "archived", changed_by)
+
+    # Detail rows first, they reference devices
+    for live, archived in archived_details.items():
+        _move(db, live, archived, devices_ids)
+    _move(db, Devices.__table__, archived_devices, devices_ids, {
+        "archived_on": literal(date.today(), archived_devices.c.archived_on.type),
+        "archived_by": literal(changed_by, archived_devices.c.archived_by.type),
+    })
+    refresh_device_search(db, devices_ids)
+    db.commit()
+
+    for serial_number in serial_numbers:
+        invalidate_device(serial_number)
+    cache.invalidate("devices")
+    return serial_numbers
+
+def restore_device(db, serial_number, changed_by):
+    row = (
+        db.query(archived_devices.c.devices_id)
+        .filter(archived_devices.c.serial_number == serial_number)
+        .with_for_update()
+        .first()
+    )
+    if row is None:
+        return None
+
+    devices_id = row.devices_id
+    try:
+        _move(db, archived_devices, Devices.__table__, [devices_id])
+        for live, archived in archived_details.items():
+            _move(db, archived, live, [devices_id])
+        db.flush()
+    except IntegrityError:
+        # Another live device took this device's unique model in the meantime
+        db.rollback()
+        raise RestoreConflict(serial_number)
+
+    # Back in service, otherwise the next scheduled run would archive it again
+    device = db.get(Devices, devices_id)
+    device.bos_date = None
+    device.bos_by = None
+    record_device_event(db, device, "restored", changed_by)
+    refresh_device_search(db, [devices_id])
+    db.commit()
+    invalidate_device(serial_number)
+    cache.invalidate("devices")
+    return device
+
+
+# THIS IS THE SECTION THAT DEFINES THE SCHEDULE ###########################################################
+def archive_all(changed_by, older_than_days=ARCHIVE_AFTER_DAYS):
+    archived = 0
+    while True:
+        db = SessionLocal()
+        try:
+            batch = archive_devices(db, changed_by, older_than_days)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        archived += len(batch)
+        if len(batch) < ARCHIVE_BATCH_SIZE:
+            return archived
+
+async def archive_forever():
+    while True:
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+        try:
+            archived = await asyncio.to_thread(archive_all, "archive schedule")
+            if archived:
+                logging.info(f"Archived {archived} beyond service devices")
+        except Exception as e:
+            logging.error(f"Error archiving devices: {str(e)}")
@@ -0,0 +1,317 @@
+import os
+import time
+import pickle
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# CACHE_BACKEND picks the shared tier behind the per-worker LRU:
+#   memory - no shared tier, every worker caches on its own
+#   file   - a SQLite file on the same host (CACHE_URL is the path, /dev/shm works well)
+#   redis  - a Redis compatible server (CACHE_URL is the redis:// url)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_URL = os.getenv("CACHE_URL")
+CACHE_SIZE = int(os.getenv("CACHE_SIZE", "2048"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# THIS IS THE SECTION THAT DEFINES THE SHARED STORES ########################################################
+# A shared store keeps pickled values with an expiry and one integer version per tag.
+
+class FileStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_entries (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_tags (tag TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute("SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return _MISSING
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value), time.time() + ttl),
+        )
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def tag_versions(self, tags):
+        if not tags:
+            return {}
+        rows = self._connect().execute(
+            f"SELECT tag, version FROM cache_tags WHERE tag IN ({','.join('?' * len(tags))})", tuple(tags)
+        ).fetchall()
+        versions = dict(rows)
+        return {tag: versions.get(tag, 0) for tag in tags}
+
+    def bump(self, tags):
+        conn = self._connect()
+        for tag in tags:
+            conn.execute("INSERT INTO cache_tags (tag, version) VALUES (?, 1) ON CONFLICT(tag) DO UPDATE SET version = version + 1", (tag,))
+        conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (time.time(),))
+
+
+class RedisStore:
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.client.get("cache:" + key)
+        return _MISSING if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl):
+        self.client.set("cache:" + key, pickle.dumps(value), ex=max(int(ttl), 1))
+
+    def delete(self, key):
+        self.client.delete("cache:" + key)
+
+    def tag_versions(self, tags):
+        if not tags:
+            return {}
+        values = self.client.mget(["cache-tag:" + tag for tag in tags])
+        return {tag: int(value or 0) for tag, value in zip(tags, values)}
+
+    def bump(self, tags):
+        pipe = self.client.pipeline()
+        for tag in tags:
+            pipe.incr("cache-tag:" + tag)
+        pipe.execute()
+
+
+class LocalTags:
+    """Tag versions for the memory backend, private to this worker and shared by its caches."""
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def tag_versions(self, tags):
+        with self._lock:
+            return {tag: self._versions.setdefault(tag, 0) for tag in tags}
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    # Used when invalidations may have been missed: every tag seen so far goes stale
+    def bump_all(self):
+        with self._lock:
+            for tag in self._versions:
+                self._versions[tag] += 1
+
+
+local_tags = LocalTags()
+
+# Called with the tags of every invalidation. The invalidation bus registers here so
+# the other workers hear about it.
+invalidation_hooks = []
+
+
+# THIS IS THE SECTION THAT DEFINES THE CACHE ################################################################
+class Cache:
+    """
+    Two tier cache: a per-worker LRU in front of an optional shared store.
+
+    Every entry remembers the versions of its tags when it was stored. invalidate(tag)
+    bumps the tag's version (in the shared store when there is one, so all workers see
+    it) and any entry stored under an older version is treated as a miss.
+    """
+    def __init__(self, backend=CACHE_BACKEND, url=CACHE_URL, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.local = LRUCache(maxsize)
+        self.ttl = ttl
+        self.shared = None
+        self.tags = local_tags
+        self.hits = 0
+        self.misses = 0
+
+        try:
+            if backend == "file":
+                self.shared = FileStore(url or "/tmp/inventory-cache.sqlite3")
+            elif backend == "redis":
+                self.shared = RedisStore(url or "redis://localhost:6379/0")
+        except Exception as e:
+            logging.error(f"Shared cache '{backend}' unavailable, using memory only: {str(e)}")
+            self.shared = None
+
+        if self.shared is not None:
+            self.tags = self.shared
+
+    def _versions(self, tags):
+        try:
+            return self.tags.tag_versions(tags)
+        except Exception as e:
+            logging.error(f"Cache tag lookup failed: {str(e)}")
+            return None
+
+    def get(self, key, tags=()):
+        tags = tuple(tags)
+        versions = self._versions(tags)
+        if versions is None:
+            return _MISSING
+
+        entry = self.local.get(key)
+        if entry is _MISSING and self.shared is not None:
+            try:
+                entry = self.shared.get(key)
+            except Exception as e:
+                logging.error(f"Shared cache get failed: {str(e)}")
+                entry = _MISSING
+            if entry is not _MISSING:
+                self.local.set(key, entry, self.ttl)
+
+        if entry is _MISSING:
+            return _MISSING
+        value, stored_versions = entry
+        if stored_versions != versions:
+            self.local.delete(key)
+            return _MISSING
+        return value
+
+    def set(self, key, value, tags=(), ttl=None, versions=None):
+        tags = tuple(tags)
+        ttl = ttl or self.ttl
+        if versions is None:
+            versions = self._versions(tags)
+        if versions is None:
+            return
+        entry = (value, versions)
+        self.local.set(key, entry, ttl)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, entry, ttl)
+            except Exception as e:
+                logging.error(f"Shared cache set failed: {str(e)}")
+
+    def get_or_set(self, key, loader, tags=(), ttl=None):
+        tags = tuple(tags)
+        value = self.get(key, tags)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+        # Versions are read before loading, so a write that lands while we load makes this entry stale
+        versions = self._versions(tags)
+        value = loader()
+        self.set(key, value, tags, ttl, versions)
+        return value
+
+    def invalidate(self, *tags):
+        try:
+            self.tags.bump(tags)
+        except Exception as e:
+            logging.error(f"Cache invalidation failed, clearing local tier: {str(e)}")
+            self.local.clear()
+        for hook in invalidation_hooks:
+            hook(tags)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "local_entries": len(self.local),
+            "local_maxsize": self.local.maxsize,
+            "ttl": self.ttl,
+            "shared": type(self.shared).__name__ if self.shared is not None else None,
+        }
+
+
+def row_to_dict(row):
+    return {column.key: getattr(row, column.key) for column in row.__table__.columns}
+
+
+cache = Cache()
+
+# /get-item-sn/ responses, keyed by (category, serial) and tagged with the serial number
+device_detail_cache = Cache(
+    maxsize=int(os.getenv("DEVICE_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("DEVICE_CACHE_TTL", "120")),
+)
+
+def device_tags(serial_number):
+    return ("devices", f"device:{serial_number}")
+
+# Set while deferred_device_invalidations() is active; invalidate_device() then only collects
+_deferred_serials = ContextVar("deferred_serials", default=None)
+
+# Called by every endpoint that changes one device, so only that device's entries go stale
+def invalidate_device(serial_number):
+    deferred = _deferred_serials.get()
+    if deferred is not None:
+        deferred.add(serial_number)
+        return
+    device_detail_cache.invalidate(f"device:{serial_number}")
+
+# For callers whose handlers commit before the real commit (see routers/batch.py): the serials
+# handlers invalidate are collected, for the caller to invalidate once its transaction commits
+@contextmanager
+def deferred_device_invalidations():
+    serials = set()
+    token = _deferred_serials.set(serials)
+    try:
+        yield serials
+    finally:
+        _deferred_serials.reset(token)
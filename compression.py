@@ -0,0 +1,182 @@
+import os
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Responses smaller than COMPRESSION_MIN_SIZE bytes are sent as they are. COMPRESSION_ENCODINGS is
+# the server's preference order; encodings whose package (brotli, zstandard) is not installed are skipped.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_ENCODINGS = os.getenv("COMPRESSION_ENCODINGS", "br,zstd,gzip")
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "application/xml", "image/svg+xml", "text/")
+# Server sent events are long lived and made of tiny messages, so they are left alone
+EXCLUDED_TYPES = ("text/event-stream",)
+
+
+# THIS IS THE SECTION THAT DEFINES THE ENCODERS #############################################################
+# Each encoder is fed the body chunk by chunk. compress(data, flush=True) also returns everything
+# the compressor has buffered so far, so what was streamed up to now reaches the client.
+
+class GzipEncoder:
+    def __init__(self, level=COMPRESSION_GZIP_LEVEL):
+        # wbits 31 writes the gzip container instead of a raw zlib stream
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data, flush=False):
+        output = self._compressor.compress(data)
+        return output + self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else output
+
+    def finish(self):
+        return self._compressor.flush()
+
+class BrotliEncoder:
+    def __init__(self, quality=COMPRESSION_BROTLI_QUALITY):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data, flush=False):
+        output = self._compressor.process(data)
+        return output + self._compressor.flush() if flush else output
+
+    def finish(self):
+        return self._compressor.finish()
+
+class ZstdEncoder:
+    def __init__(self, level=COMPRESSION_ZSTD_LEVEL):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data, flush=False):
+        output = self._compressor.compress(data)
+        return output + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) if flush else output
+
+    def finish(self):
+        return self._compressor.flush()
+
+ENCODERS = {"gzip": GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+
+def available_encodings():
+    return [name.strip() for name in COMPRESSION_ENCODINGS.split(",") if name.strip() in ENCODERS]
+
+# Picks the first encoding in our preference order that the Accept-Encoding header allows
+def negotiate(accept_encoding, encodings=None):
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.strip()] = quality
+
+    for encoding in available_encodings() if encodings is None else encodings:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+def compressible(headers):
+    if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+        return False
+    content_type = headers.get("content-type", "").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(EXCLUDED_TYPES)
+
+
+# THIS IS THE SECTION THAT DEFINES THE MIDDLEWARE ###########################################################
+class CompressionMiddleware:
+    """
+    Compresses JSON and text responses with the best encoding the client accepts (br, zstd
+    or gzip). A response sent in one piece is only compressed when it is at least
+    COMPRESSION_MIN_SIZE bytes. A streamed response is compressed as it goes and loses its
+    Content-Length; the encoder is flushed each time another min_size bytes have gone in, so
+    the client keeps receiving data without every small chunk costing a flush.
+    """
+    def __init__(self, app, min_size=COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        encoder = None
+        passthrough = False
+        pending = 0
+
+        async def compressing_send(message):
+            nonlocal start, encoder, passthrough, pending
+            if passthrough or message["type"] not in ("http.response.start", "http.response.body"):
+                await send(message)
+                return
+
+            # The start is held back until the first body chunk shows whether to compress
+            if message["type"] == "http.response.start":
+                start = message
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            pending += len(body)
+            flush = more_body and pending >= self.min_size
+            if flush:
+                pending = 0
+
+            if encoder is None:
+                headers = MutableHeaders(raw=list(start.get("headers", [])))
+                if not compressible(headers) or (not more_body and len(body) < self.min_size):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                encoder = ENCODERS[encoding]()
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                # The compressed bytes differ per encoding, so a strong ETag would be wrong
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = "W/" + etag
+
+                if more_body:
+                    if "content-length" in headers:
+                        del headers["content-length"]
+                    body = encoder.compress(body, flush=flush)
+                else:
+                    body = encoder.compress(body) + encoder.finish()
+                    headers["Content-Length"] = str(len(body))
+
+                await send({**start, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            body = encoder.compress(body, flush=flush)
+            if not more_body:
+                body += encoder.finish()
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, compressing_send)
@@ -0,0 +1,98 @@
+"""
+Measures what response compression costs and saves on device list payloads:
+
+    python compression_bench.py                      # synthetic lists of 100 to 10000 devices
+    python compression_bench.py --port 8000 --token <access token> --path /get-items/
+
+The synthetic run encodes a /get-items/ shaped list with every available encoder at a
+few levels and prints the bytes on the wire and the CPU time per response. With --token
+it asks a running server for --path once per encoding and prints the wire bytes and the
+time to the last byte.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import http.client
+from datetime import date, timedelta
+from compression import ENCODERS
+
+LEVELS = {"gzip": [1, 6, 9], "br": [1, 4, 8], "zstd": [1, 3, 9]}
+
+
+def device_list(count):
+    categories = ["Laptop", "Tablet", "Printer", "Mouse", "Keyboard"]
+    statuses = [(1, "Active"), (2, "Repair"), (3, "Stored")]
+    rows = []
+    for i in range(count):
+        status_id, status_description = random.choice(statuses)
+        division_id = random.randint(1, 40)
+        rows.append({
+            "devices_id": i + 1,
+            "category": random.choice(categories),
+            "brand": random.choice(["HP", "Dell", "Lenovo", "Apple"]),
+            "model": f"model-{i}",
+            "serial_number": f"SN{random.randint(0, 10**8):08d}",
+            "inventory_number": f"INV{i:08d}",
+            "delivery_date": str(date(2020, 1, 1) + timedelta(days=random.randint(0, 1500))),
+            "deployment_date": None,
+            "status_id": status_id,
+            "division_id": division_id,
+            "status_description": status_description,
+            "division_name": f"Division {division_id}",
+            "client_id": None,
+            "client_name": None,
+            "version": 1,
+        })
+    return json.dumps(rows).encode()
+
+def encode(name, level, body):
+    encoder = ENCODERS[name](level)
+    return encoder.compress(body) + encoder.finish()
+
+def cpu_ms(name, level, body, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        encode(name, level, body)
+    return (time.process_time() - started) / repeat * 1000
+
+def synthetic(sizes):
+    print(f"{'devices':>8} {'encoding':>9} {'level':>5} {'bytes':>10} {'ratio':>7} {'cpu ms':>8}")
+    for count in sizes:
+        body = device_list(count)
+        print(f"{count:8d} {'identity':>9} {'-':>5} {len(body):10d} {1:7.2f} {0:8.2f}")
+        for name in ENCODERS:
+            for level in LEVELS[name]:
+                size = len(encode(name, level, body))
+                print(f"{count:8d} {name:>9} {level:5d} {size:10d} {len(body) / size:7.2f} {cpu_ms(name, level, body, max(1, 20000 // count)):8.2f}")
+
+def live(args):
+    print(f"{'encoding':>9} {'wire bytes':>11} {'ms':>8}")
+    for encoding in ["identity"] + list(ENCODERS):
+        conn = http.client.HTTPConnection(args.host, args.port, timeout=60)
+        started = time.perf_counter()
+        conn.request("GET", args.path, headers={"Authorization": f"Bearer {args.token}", "Accept-Encoding": encoding})
+        response = conn.getresponse()
+        wire = len(response.read())
+        elapsed = (time.perf_counter() - started) * 1000
+        conn.close()
+        if response.status != 200:
+            sys.exit(f"{args.path} returned {response.status}")
+        print(f"{response.getheader('Content-Encoding') or 'identity':>9} {wire:11d} {elapsed:8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark response compression on device lists.")
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--token")
+    parser.add_argument("--path", default="/get-items/")
+    args = parser.parse_args()
+
+    random.seed(1)
+    if args.token:
+        live(args)
+    else:
+        synthetic([int(size) for size in args.sizes.split(",")])
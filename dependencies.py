@@ -0,0 +1,137 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Annotated
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import jwt, JWTError
+from sqlalchemy.orm import Session
+from models import SessionLocal, Users, Clients, TokenData
+from replicas import replica_router
+from cache import cache
+
+load_dotenv()
+
+SECRET_KEY = os.getenv('SECRET_KEY')
+ALGORITHM = os.getenv('ALGORITHM')
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES'))
+ORGIN = os.getenv('ORGIN')
+USERNAME = os.getenv('DEFAULT_USERNAME')
+PASSWORD = os.getenv('DEFAULT_PASSWORD')
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+_pwd_context = None
+
+# passlib loads its bcrypt backend on construction, so the context is only built on first use
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+
+# The route limiter puts its route class's statement timeout on request.state; it is applied
+# to every transaction the session begins
+def get_db(request: Request):
+    db = SessionLocal()
+    db.info["statement_timeout"] = getattr(request.state, "statement_timeout", None)
+    try:
+        yield db
+    finally:
+        db.close()
+
+db_dependency = Annotated[Session, Depends(get_db)]
+
+# Sessions for read-only endpoints, served by a replica when DATABASE_READ_URL is set
+def get_read_db(request: Request, token: Annotated[str | None, Depends(optional_oauth2_scheme)]):
+    db = replica_router.read_session(token_subject(token))
+    db.info["statement_timeout"] = getattr(request.state, "statement_timeout", None)
+    try:
+        yield db
+    finally:
+        db.close()
+
+read_db_dependency = Annotated[Session, Depends(get_read_db)]
+
+
+# THIS IS THE SECTION THAT DEFINES FUNCTIONS #################################################################
+async def get_current_user(db: db_dependency, token: Annotated[str, Depends(oauth2_scheme)]):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        email = payload.get("sub")
+        if email is None:
+            raise credentials_exception
+        token_data = TokenData(username=email, )
+    except JWTError:
+        raise credentials_exception
+    user = get_cached_user(db, email=token_data.username)
+    if user is  None:
+        raise credentials_exception
+    db.info["user"] = user.email
+    return user
+
+user_dependency = Annotated[dict, Depends(get_current_user)]
+
+
+def verify_password(plain_password, hashed_password):
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+def get_password_hash(password):
+    return get_pwd_context().hash(password)
+
+
+def token_subject(token: str | None):
+    if not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+
+def create_access_token(data: dict, expires_delta: timedelta | None = None):
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.now(timezone.utc) + expires_delta
+    else:
+        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
+    to_encode.update({"exp": expire})
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+def get_user(db, email: str):
+    return db.query(Users).filter(Users.email == email).first()
+
+# The fields the auth dependency hands to endpoints. The password hash is left out, so it
+# never reaches the shared cache tier; password checks load the user from the database.
+CACHED_USER_FIELDS = ("user_id", "email", "firstname", "lastname", "role_id", "active")
+
+# Every authenticated request looks its user up, so the record is cached under the "users"
+# tag and handed back as a detached Users instance
+def get_cached_user(db, email: str):
+    def load():
+        user = get_user(db, email)
+        return {field: getattr(user, field) for field in CACHED_USER_FIELDS} if user else None
+
+    record = cache.get_or_set(f"auth-user:{email}", load, tags=("users",))
+    return Users(**record) if record else None
+
+def get_client(db, email: str):
+    return db.query(Clients).filter(Clients.email == email).first()
+
+
+def authenticate_user(db, username: str, password: str):
+    user = get_user(db, username)
+    if not user:
+        return False
+    if not verify_password(password, user.password):
+        return False
+    return user
@@ -0,0 +1,98 @@
+import json
+from datetime import datetime
+from sqlalchemy import event, text
+from models import SessionLocal, DeviceEvents
+from cache import cache
+
+# Arbitrary advisory lock id used to serialize event inserts and commits on Postgres
+EVENT_LOCK_ID = 7300421
+
+# Cache tag bumped after every commit that added device events, so readers of device_events
+# (hierarchy.py) can tell whether anything was written without querying the table
+DEVICE_EVENTS_TAG = "device-events"
+
+# Fields sent with every device event, enough for a client to patch its device list
+SNAPSHOT_FIELDS = [
+    "devices_id", "category", "brand", "model", "serial_number", "inventory_number",
+    "delivery_date", "deployment_date", "status_id", "division_id", "client_id",
+]
+
+def device_snapshot(device):
+    return {field: getattr(device, field) for field in SNAPSHOT_FIELDS}
+
+# Queues the event on the caller's session, so it commits (or rolls back) with the write itself.
+# The rows are only inserted by _insert_queued_events() just before COMMIT.
+def record_device_event(db, device, action, changed_by):
+    device_event = DeviceEvents(
+        devices_id = device.devices_id,
+        serial_number = device.serial_number,
+        action = action,
+        payload = json.dumps(device_snapshot(device), default=str),
+        changed_by = changed_by,
+        changed_at = datetime.now(),
+    )
+    # Kept with the savepoint it was recorded in, so rolling that savepoint back drops it
+    transaction = db.get_nested_transaction() or db.get_transaction()
+    db.info.setdefault("queued_device_events", []).append((device_event, transaction))
+    return device_event
+
+
+# THIS IS THE SECTION THAT DEFINES THE COMMIT HOOKS ##########################################################
+# A reader of /changes/?since=<seq> must never see seq 11 committed before seq 10, or it would
+# skip 10 for good. On Postgres the event rows are therefore inserted under one advisory lock
+# that is held from the insert to the COMMIT, so seq order is commit order. The write itself
+# is flushed before the lock is taken, so writers to different devices only queue for the
+# event insert and the commit, not for their whole transaction.
+
+@event.listens_for(SessionLocal, "before_commit")
+def _insert_queued_events(session):
+    # Releasing a savepoint fires this too; its events wait for the real COMMIT
+    if session.in_nested_transaction():
+        return
+    queued = session.info.pop("queued_device_events", [])
+    if not queued:
+        return
+
+    session.flush()
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": EVENT_LOCK_ID})
+    for device_event, _ in queued:
+        session.add(device_event)
+        session.info.setdefault("device_events", []).append(device_event)
+    session.flush()
+    session.info["device_events_inserted"] = True
+
+@event.listens_for(SessionLocal, "after_commit")
+def _announce_committed_events(session):
+    if session.info.pop("device_events_inserted", False):
+        cache.invalidate(DEVICE_EVENTS_TAG)
+
+def _recorded_inside(transaction, savepoint):
+    while transaction is not None:
+        if transaction is savepoint:
+            return True
+        transaction = transaction.parent
+    return False
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _drop_rolled_back_events(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop("queued_device_events", None)
+        session.info.pop("device_events_inserted", None)
+        return
+    queued = session.info.get("queued_device_events", [])
+    session.info["queued_device_events"] = [
+        (device_event, transaction) for device_event, transaction in queued
+        if not _recorded_inside(transaction, previous_transaction)
+    ]
+
+def event_to_dict(event):
+    return {
+        "seq": event.seq,
+        "devices_id": event.devices_id,
+        "serial_number": event.serial_number,
+        "action": event.action,
+        "device": json.loads(event.payload) if event.payload else None,
+        "changed_by": event.changed_by,
+        "changed_at": event.changed_at,
+    }
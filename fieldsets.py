@@ -0,0 +1,73 @@
+from fastapi import HTTPException
+from models import Devices, SystemStatus, Divisions, Clients
+
+# Sparse fieldsets for the device lists: ?fields=serial_number,category,status_description
+# selects only the columns (and joins) those fields need.
+
+# The device list fields in response order. Anything not in JOINED_FIELDS is a column of
+# devices, or of archived_devices for archived rows.
+LIST_FIELDS = [
+    "devices_id", "category", "brand", "model", "serial_number", "inventory_number",
+    "delivery_date", "deployment_date", "status_id", "division_id",
+    "status_description", "division_name", "client_id", "client_name", "row_version",
+]
+
+# Devices.version is the optimistic-lock counter. The API calls it row_version, so it never
+# clashes with the version (OS version) a tablet's detail row carries.
+FIELD_COLUMNS = {"row_version": "version"}
+COLUMN_FIELDS = {column: field for field, column in FIELD_COLUMNS.items()}
+
+JOINED_FIELDS = {
+    "status_description": [SystemStatus.status_description],
+    "division_name": [Divisions.division_name],
+    "client_name": [Clients.firstname, Clients.lastname],
+}
+
+# The joined field whose table a list filter reads
+FILTER_JOINS = {"Status": "status_description", "Division": "division_name", "Client": "client_name"}
+
+
+def parse_fields(fields, allowed=LIST_FIELDS):
+    if not fields:
+        return list(allowed)
+
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown or not names:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(allowed)}")
+    return names
+
+def list_columns(names, columns=Devices.__table__.c):
+    selected = []
+    for name in names:
+        selected.extend(JOINED_FIELDS.get(name) or [columns[FIELD_COLUMNS.get(name, name)].label(name)])
+    return selected
+
+# Outer joins only the tables the requested fields or the filter read
+def list_joins(query, names, filter, columns=Devices.__table__.c):
+    joined = set(names) | {FILTER_JOINS.get(filter)}
+    if "status_description" in joined:
+        query = query.outerjoin(SystemStatus, columns.status_id == SystemStatus.status_id)
+    if "division_name" in joined:
+        query = query.outerjoin(Divisions, columns.division_id == Divisions.division_id)
+    if "client_name" in joined:
+        query = query.outerjoin(Clients, columns.client_id == Clients.client_id)
+    return query
+
+def client_name(firstname, lastname):
+    if firstname or lastname:
+        return f"{firstname or ''} {lastname or ''}".strip()
+    return None
+
+def row_to_item(row, names):
+    item = {}
+    for name in names:
+        if name == "client_name":
+            item[name] = client_name(row.firstname, row.lastname)
+        else:
+            item[name] = getattr(row, name)
+    return item
+
+# A devices row as the API returns it, e.g. after a write
+def device_out(device):
+    return {COLUMN_FIELDS.get(column.key, column.key): getattr(device, column.key) for column in Devices.__table__.columns}
@@ -0,0 +1,179 @@
+import threading
+from collections import Counter
+from models import SessionLocal, Devices, DeviceEvents, SystemStatus, Divisions, Locations, Parishes
+from cache import cache
+from device_events import DEVICE_EVENTS_TAG
+
+# Bulk writes that change devices without a device event bump one of these, which forces a full load
+STRUCTURE_TAGS = ("parishes", "locations", "divisions", "statuses", "devices")
+
+
+class HierarchyTree:
+    """
+    Parish -> location -> division tree with device counts per node. The structure comes
+    from one joined query and the devices from another; after that only the devices named
+    in device_events since the last seq are read again, so a refresh costs one indexed
+    query when nothing changed. Counts are kept per (division, category, status) and
+    rolled up to locations and parishes when the tree is rendered.
+    """
+    def __init__(self):
+        self.ready = False
+        self.last_seq = 0
+        self.tag_versions = None
+        self._rendered = {}
+        self._lock = threading.Lock()
+
+    # THIS IS THE SECTION THAT LOADS THE TREE ###############################################################
+    def _full_load(self, db):
+        latest = db.query(DeviceEvents.seq).order_by(DeviceEvents.seq.desc()).first()
+
+        self.structure = (
+            db.query(
+                Parishes.parish_id, Parishes.parish_name,
+                Locations.location_id, Locations.location_name,
+                Divisions.division_id, Divisions.division_name,
+            )
+            .outerjoin(Locations, Locations.parish_id == Parishes.parish_id)
+            .outerjoin(Divisions, Divisions.location_id == Locations.location_id)
+            .order_by(Parishes.parish_id, Locations.location_id, Divisions.division_id)
+            .all()
+        )
+        self.status_names = dict(db.query(SystemStatus.status_id, SystemStatus.status_description).all())
+
+        self.devices = {}
+        self.counts = Counter()
+        for devices_id, division_id, category, status_id in db.query(Devices.devices_id, Devices.division_id, Devices.category, Devices.status_id):
+            self._add(devices_id, (division_id, category, status_id))
+
+        self.last_seq = latest[0] if latest else 0
+
+    def _add(self, devices_id, key):
+        self.devices[devices_id] = key
+        self.counts[key] += 1
+
+    def _remove(self, devices_id):
+        key = self.devices.pop(devices_id, None)
+        if key is not None:
+            self.counts[key] -= 1
+            if not self.counts[key]:
+                del self.counts[key]
+
+    def _apply_changes(self, db):
+        events = db.query(DeviceEvents.seq, DeviceEvents.devices_id).filter(DeviceEvents.seq > self.last_seq).order_by(DeviceEvents.seq).all()
+        if not events:
+            return False
+
+        changed = {devices_id for _, devices_id in events}
+        current = {
+            devices_id: (division_id, category, status_id)
+            for devices_id, division_id, category, status_id in
+            db.query(Devices.devices_id, Devices.division_id, Devices.category, Devices.status_id).filter(Devices.devices_id.in_(changed))
+        }
+        # Deleted and archived devices are simply not found again
+        for devices_id in changed:
+            self._remove(devices_id)
+            if devices_id in current:
+                self._add(devices_id, current[devices_id])
+
+        self.last_seq = events[-1][0]
+        return True
+
+    def refresh(self):
+        # Read before loading, so a write that lands while we load is picked up next time
+        versions = cache.tags.tag_versions(STRUCTURE_TAGS + (DEVICE_EVENTS_TAG,))
+        with self._lock:
+            if self.ready and versions == self.tag_versions:
+                return
+            db = SessionLocal()
+            try:
+                if not self.ready or any(versions[tag] != self.tag_versions[tag] for tag in STRUCTURE_TAGS):
+                    self._full_load(db)
+                    changed = True
+                else:
+                    changed = self._apply_changes(db)
+                if changed:
+                    self._rendered = {}
+                self.tag_versions = versions
+                self.ready = True
+            finally:
+                db.close()
+
+    # THIS IS THE SECTION THAT RENDERS THE TREE #############################################################
+    def _node(self, counts, by_category, by_status):
+        node = {"device_count": sum(counts.values())}
+        if by_category:
+            categories = Counter()
+            for (category, _), count in counts.items():
+                categories[category] += count
+            node["by_category"] = dict(categories)
+        if by_status:
+            statuses = Counter()
+            for (_, status_id), count in counts.items():
+                statuses[self.status_names.get(status_id)] += count
+            node["by_status"] = dict(statuses)
+        return node
+
+    def _render(self, by_category, by_status):
+        per_division = {}
+        everything = Counter()
+        for (division_id, category, status_id), count in self.counts.items():
+            per_division.setdefault(division_id, Counter())[(category, status_id)] += count
+            everything[(category, status_id)] += count
+
+        parishes = {}
+        placed = set()
+        for parish_id, parish_name, location_id, location_name, division_id, division_name in self.structure:
+            parish = parishes.setdefault(parish_id, {"parish_id": parish_id, "parish_name": parish_name, "counts": Counter(), "locations": {}})
+            if location_id is None:
+                continue
+            location = parish["locations"].setdefault(location_id, {"location_id": location_id, "location_name": location_name, "counts": Counter(), "divisions": []})
+            if division_id is None:
+                continue
+            counts = per_division.get(division_id, Counter())
+            placed.add(division_id)
+            location["counts"].update(counts)
+            parish["counts"].update(counts)
+            location["divisions"].append({
+                "division_id": division_id,
+                "division_name": division_name,
+                **self._node(counts, by_category, by_status),
+            })
+
+        # Devices without a division, or in a division that is not under a parish
+        unplaced = Counter()
+        for division_id, counts in per_division.items():
+            if division_id not in placed:
+                unplaced.update(counts)
+
+        return {
+            **self._node(everything, by_category, by_status),
+            "unplaced": self._node(unplaced, by_category, by_status),
+            "parishes": [
+                {
+                    "parish_id": parish["parish_id"],
+                    "parish_name": parish["parish_name"],
+                    **self._node(parish["counts"], by_category, by_status),
+                    "locations": [
+                        {
+                            "location_id": location["location_id"],
+                            "location_name": location["location_name"],
+                            **self._node(location["counts"], by_category, by_status),
+                            "divisions": location["divisions"],
+                        }
+                        for location in parish["locations"].values()
+                    ],
+                }
+                for parish in parishes.values()
+            ],
+        }
+
+    def tree(self, by_category=False, by_status=False):
+        self.refresh()
+        with self._lock:
+            key = (by_category, by_status)
+            if key not in self._rendered:
+                self._rendered[key] = self._render(by_category, by_status)
+            return self._rendered[key]
+
+
+hierarchy_tree = HierarchyTree()
@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from models import SessionLocal, IdempotencyKeys
+from dependencies import token_subject
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# A key still marked in progress after this long belongs to a request that never finished
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+IDEMPOTENCY_MAX_BODY = int(os.getenv("IDEMPOTENCY_MAX_BODY", str(1024 * 1024)))
+IDEMPOTENCY_SWEEP_SECONDS = float(os.getenv("IDEMPOTENCY_SWEEP_SECONDS", "300"))
+
+IDEMPOTENT_METHODS = ("POST", "PUT")
+# /token responses carry access tokens, which should not be written to the database
+EXCLUDED_PATHS = {"/token"}
+
+CLAIMED = "claimed"
+REPLAY = "replay"
+IN_PROGRESS = "in_progress"
+MISMATCH = "mismatch"
+
+_last_sweep = 0.0
+
+
+# THIS IS THE SECTION THAT DEFINES THE KEY STORE ############################################################
+# The row is inserted before the request runs, so a retry that arrives while the first
+# attempt is still running is turned away instead of running the write twice.
+
+def _claim(key, fingerprint):
+    db = SessionLocal()
+    try:
+        now = datetime.now()
+        record = db.get(IdempotencyKeys, key)
+        if record is not None and record.expires_at < now:
+            db.delete(record)
+            db.commit()
+            record = None
+
+        if record is None:
+            db.add(IdempotencyKeys(
+                key = key,
+                fingerprint = fingerprint,
+                created_at = now,
+                expires_at = now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+            ))
+            try:
+                db.commit()
+                return CLAIMED, None
+            except IntegrityError:
+                db.rollback()
+                record = db.get(IdempotencyKeys, key)
+                if record is None:
+                    return IN_PROGRESS, None
+
+        if record.fingerprint != fingerprint:
+            return MISMATCH, None
+
+        if record.status_code is None:
+            taken_over = db.query(IdempotencyKeys).filter(
+                IdempotencyKeys.key == key,
+                IdempotencyKeys.status_code == None,
+                IdempotencyKeys.created_at < now - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+            ).update({IdempotencyKeys.created_at: now}, synchronize_session=False)
+            db.commit()
+            return (CLAIMED, None) if taken_over else (IN_PROGRESS, None)
+
+        return REPLAY, (record.status_code, json.loads(record.headers or "[]"), record.body or b"")
+    finally:
+        db.close()
+
+def _store(key, status_code, headers, body):
+    global _last_sweep
+    db = SessionLocal()
+    try:
+        db.query(IdempotencyKeys).filter(IdempotencyKeys.key == key).update({
+            IdempotencyKeys.status_code: status_code,
+            IdempotencyKeys.headers: json.dumps(headers),
+            IdempotencyKeys.body: body,
+        }, synchronize_session=False)
+
+        if time.monotonic() - _last_sweep > IDEMPOTENCY_SWEEP_SECONDS:
+            _last_sweep = time.monotonic()
+            db.query(IdempotencyKeys).filter(IdempotencyKeys.expires_at < datetime.now()).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def _release(key):
+    db = SessionLocal()
+    try:
+        db.query(IdempotencyKeys).filter(IdempotencyKeys.key == key).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+# THIS IS THE SECTION THAT DEFINES THE MIDDLEWARE ###########################################################
+class IdempotencyMiddleware:
+    """
+    Makes POST/PUT requests that carry an Idempotency-Key header safe to retry. The first
+    response for a (user, method, path, key) is stored and later requests with the same key
+    get it back with Idempotent-Replayed: true, without running the endpoint again. Reusing
+    a key for a different body is rejected with 422. Server errors are not stored, so those
+    requests can be retried.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS or scope["path"] in EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+
+        if len(idempotency_key) > 255:
+            await JSONResponse({"detail": "Idempotency-Key is too long"}, status_code=400)(scope, receive, send)
+            return
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        authorization = headers.get("authorization", "")
+        user = token_subject(authorization[7:]) if authorization.lower().startswith("bearer ") else None
+        key = hashlib.sha256(f"{user}\n{scope['method']}\n{scope['path']}\n{idempotency_key}".encode()).hexdigest()
+        fingerprint = hashlib.sha256(scope.get("query_string", b"") + b"\n" + body).hexdigest()
+
+        try:
+            state, stored = await asyncio.to_thread(_claim, key, fingerprint)
+        except Exception as e:
+            logging.error(f"Idempotency key lookup failed, running request without it: {str(e)}")
+            state, stored = None, None
+
+        if state == REPLAY:
+            status_code, stored_headers, stored_body = stored
+            await send({
+                "type": "http.response.start",
+                "status": status_code,
+                "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored_headers] + [(b"idempotent-replayed", b"true")],
+            })
+            await send({"type": "http.response.body", "body": stored_body})
+            return
+
+        if state == MISMATCH:
+            await JSONResponse({"detail": "Idempotency-Key was already used for a different request"}, status_code=422)(scope, receive, send)
+            return
+
+        if state == IN_PROGRESS:
+            await JSONResponse({"detail": "A request with this Idempotency-Key is still being processed"}, status_code=409, headers={"Retry-After": "1"})(scope, receive, send)
+            return
+
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response = {"status": None, "headers": [], "body": b"", "too_large": False}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [(name.decode("latin-1"), value.decode("latin-1")) for name, value in message.get("headers", [])]
+            elif message["type"] == "http.response.body" and not response["too_large"]:
+                response["body"] += message.get("body", b"")
+                if len(response["body"]) > IDEMPOTENCY_MAX_BODY:
+                    response["too_large"] = True
+                    response["body"] = b""
+            await send(message)
+
+        if state is None:
+            await self.app(scope, replay_receive, send)
+            return
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except Exception:
+            await asyncio.to_thread(_release, key)
+            raise
+
+        try:
+            if response["status"] is not None and response["status"] < 500 and not response["too_large"]:
+                await asyncio.to_thread(_store, key, response["status"], response["headers"], response["body"])
+            else:
+                await asyncio.to_thread(_release, key)
+        except Exception as e:
+            logging.error(f"Could not store idempotent response: {str(e)}")
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from collections import deque
+from sqlalchemy import text
+from models import engine
+from cache import cache, device_detail_cache, local_tags, invalidation_hooks
+
+# INVALIDATION_BUS picks how cache invalidations reach the other workers:
+#   auto     - postgres when DATABASE_URL is Postgres, local otherwise
+#   postgres - NOTIFY on INVALIDATION_CHANNEL, every worker LISTENs
+#   local    - in-process only, for SQLite and single worker runs
+INVALIDATION_BUS = os.getenv("INVALIDATION_BUS", "auto")
+INVALIDATION_CHANNEL = os.getenv("INVALIDATION_CHANNEL", "cache_invalidation")
+INVALIDATION_KEEPALIVE_SECONDS = float(os.getenv("INVALIDATION_KEEPALIVE_SECONDS", "30"))
+INVALIDATION_RECONNECT_SECONDS = float(os.getenv("INVALIDATION_RECONNECT_SECONDS", "5"))
+
+LAG_SAMPLES = 1000
+
+
+class InvalidationBus:
+    """
+    Carries cache tag invalidations between workers. Cache.invalidate() bumps the tags
+    locally and publishes them; every other worker bumps the same tags in its own
+    LocalTags, which makes its cached entries for those tags stale.
+    """
+    def __init__(self, backend=INVALIDATION_BUS):
+        if backend == "auto":
+            backend = "postgres" if engine.dialect.name == "postgresql" else "local"
+        self.backend = backend
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.published = 0
+        self.received = 0
+        self.reconnects = 0
+        self.connected = backend == "local"
+        self._lags = deque(maxlen=LAG_SAMPLES)
+        self._lock = threading.Lock()
+        self._task = None
+
+    def publish(self, tags):
+        if not tags:
+            return
+        self.published += 1
+        message = {"tags": list(tags), "origin": self.origin, "sent_at": time.time()}
+
+        if self.backend != "postgres":
+            self.receive(message)
+            return
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": INVALIDATION_CHANNEL, "payload": json.dumps(message)})
+                conn.commit()
+        except Exception as e:
+            logging.error(f"Could not publish cache invalidation: {str(e)}")
+
+    def receive(self, message):
+        with self._lock:
+            self.received += 1
+            self._lags.append(max(time.time() - message["sent_at"], 0.0))
+        # The publishing worker already bumped its own tags in Cache.invalidate()
+        if message["origin"] != self.origin:
+            local_tags.bump(message["tags"])
+
+    # Anything sent while we were not listening is lost, so every local entry goes stale
+    def _drop_local_state(self):
+        local_tags.bump_all()
+        cache.local.clear()
+        device_detail_cache.local.clear()
+
+    # THIS IS THE SECTION THAT DEFINES THE LISTENER #########################################################
+    async def start(self):
+        # Set again per worker, since with GUNICORN_PRELOAD the bus is created in the master
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        if self.backend == "postgres":
+            self._task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _connect(self):
+        # A connection of its own, taken out of the pool, since it stays in LISTEN for the worker's lifetime
+        raw = engine.raw_connection()
+        raw.detach()
+        conn = raw.driver_connection
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN "{INVALIDATION_CHANNEL}"')
+        return conn
+
+    async def _listen_forever(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            conn = None
+            try:
+                conn = await asyncio.to_thread(self._connect)
+                if self.reconnects:
+                    self._drop_local_state()
+                self.connected = True
+
+                readable = asyncio.Event()
+                loop.add_reader(conn.fileno(), readable.set)
+                try:
+                    while True:
+                        try:
+                            await asyncio.wait_for(readable.wait(), INVALIDATION_KEEPALIVE_SECONDS)
+                        except asyncio.TimeoutError:
+                            with conn.cursor() as cursor:
+                                cursor.execute("SELECT 1")
+                        readable.clear()
+                        conn.poll()
+                        while conn.notifies:
+                            notify = conn.notifies.pop(0)
+                            try:
+                                self.receive(json.loads(notify.payload))
+                            except (ValueError, KeyError) as e:
+                                logging.error(f"Ignoring malformed cache invalidation: {str(e)}")
+                finally:
+                    loop.remove_reader(conn.fileno())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Cache invalidation listener failed, reconnecting: {str(e)}")
+            finally:
+                if conn is not None:
+                    conn.close()
+
+            self.connected = False
+            self.reconnects += 1
+            await asyncio.sleep(INVALIDATION_RECONNECT_SECONDS)
+
+    def stats(self):
+        with self._lock:
+            last = self._lags[-1] if self._lags else None
+            lags = sorted(self._lags)
+        return {
+            "backend": self.backend,
+            "connected": self.connected,
+            "published": self.published,
+            "received": self.received,
+            "reconnects": self.reconnects,
+            "lag_ms": {
+                "last": round(last * 1000, 3) if lags else None,
+                "avg": round(sum(lags) / len(lags) * 1000, 3) if lags else None,
+                "p95": round(lags[min(int(len(lags) * 0.95), len(lags) - 1)] * 1000, 3) if lags else None,
+                "max": round(lags[-1] * 1000, 3) if lags else None,
+            },
+        }
+
+
+invalidation_bus = InvalidationBus()
+invalidation_hooks.append(invalidation_bus.publish)
@@ -0,0 +1,326 @@
+import os
+import io
+import csv
+import json
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_
+from models import SessionLocal, Jobs, Devices, Divisions, Locations, SystemStatus, Clients, DeviceRequest
+from search import refresh_device_search, rebuild_device_search
+from device_events import record_device_event
+from cache import cache, invalidate_device
+from archive import archive_all, ARCHIVE_AFTER_DAYS
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "5"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+# A job whose worker died is queued again until it has been started JOB_MAX_ATTEMPTS times
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Finished and failed jobs, results included, are deleted JOB_RETENTION_DAYS after they end
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+JOB_PRUNE_INTERVAL_SECONDS = float(os.getenv("JOB_PRUNE_INTERVAL_SECONDS", "3600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+
+
+# THIS IS THE SECTION THAT DEFINES THE JOB KINDS ############################################################
+# Each job takes (params, user) and returns (result, media_type). Every kind spends its
+# time in the database, so jobs run in a thread and open their own session.
+
+def export_devices_job(params, user):
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(
+                Devices.devices_id,
+                Devices.category,
+                Devices.brand,
+                Devices.model,
+                Devices.serial_number,
+                Devices.inventory_number,
+                Devices.delivery_date,
+                Devices.deployment_date,
+                SystemStatus.status_description,
+                Divisions.division_name,
+                Clients.firstname,
+                Clients.lastname,
+            )
+            .outerjoin(SystemStatus, Devices.status_id == SystemStatus.status_id)
+            .outerjoin(Divisions, Devices.division_id == Divisions.division_id)
+            .outerjoin(Clients, Devices.client_id == Clients.client_id)
+            .order_by(Devices.devices_id)
+        )
+        if params.get("categories"):
+            query = query.filter(Devices.category.in_(params["categories"]))
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([
+            "devices_id", "category", "brand", "model", "serial_number", "inventory_number",
+            "delivery_date", "deployment_date", "status_description", "division_name", "client_name",
+        ])
+        for r in query.yield_per(1000):
+            client_name = f"{r.firstname or ''} {r.lastname or ''}".strip() or None
+            writer.writerow([
+                r.devices_id, r.category, r.brand, r.model, r.serial_number, r.inventory_number,
+                r.delivery_date, r.deployment_date, r.status_description, r.division_name, client_name,
+            ])
+        return buffer.getvalue(), "text/csv"
+    finally:
+        db.close()
+
+def location_summary_job(params, user):
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Locations.location_name, Devices.category, func.count(Devices.devices_id))
+            .outerjoin(Divisions, Divisions.location_id == Locations.location_id)
+            .outerjoin(Devices, Devices.division_id == Divisions.division_id)
+            .group_by(Locations.location_id, Locations.location_name, Devices.category)
+            .order_by(Locations.location_id)
+            .all()
+        )
+        summary = {}
+        for location_name, category, count in rows:
+            counts = summary.setdefault(location_name, [])
+            if category is not None:
+                counts.append({"category": category, "count": count})
+        result = [{"location_name": name, "category_counts": counts} for name, counts in summary.items()]
+        return json.dumps(result), "application/json"
+    finally:
+        db.close()
+
+def import_devices_job(params, user):
+    devices = [DeviceRequest(**device) for device in params.get("devices", [])]
+    db = SessionLocal()
+    try:
+        rows = [
+            Devices(
+                category = device.category,
+                brand = device.brand,
+                model = device.model,
+                serial_number = device.serial_number,
+                inventory_number = device.inventory_number,
+                delivery_date = device.delivery_date,
+                deployment_date = device.deployment_date,
+                status_id = device.status_id,
+                division_id = device.division_id,
+                added_by = user,
+            )
+            for device in devices
+        ]
+        db.add_all(rows)
+        db.flush()
+        # Same as the /add-*/ endpoints: an "added" event per device in the import's transaction
+        for row in rows:
+            record_device_event(db, row, "added", user)
+        refresh_device_search(db, [row.devices_id for row in rows])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    for device in devices:
+        invalidate_device(device.serial_number)
+    cache.invalidate("devices")
+    return json.dumps({"imported": len(devices)}), "application/json"
+
+def rebuild_device_search_job(params, user):
+    db = SessionLocal()
+    try:
+        count = rebuild_device_search(db)
+        db.commit()
+        return json.dumps({"indexed": count}), "application/json"
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def archive_devices_job(params, user):
+    archived = archive_all(user, params.get("older_than_days", ARCHIVE_AFTER_DAYS))
+    return json.dumps({"archived": archived}), "application/json"
+
+JOB_KINDS = {
+    "export-devices": export_devices_job,
+    "location-summary": location_summary_job,
+    "import-devices": import_devices_job,
+    "rebuild-device-search": rebuild_device_search_job,
+    "archive-devices": archive_devices_job,
+}
+
+
+# THIS IS THE SECTION THAT DEFINES THE RUNNER ###############################################################
+class JobRunner:
+    """
+    Runs queued jobs from the jobs table inside each worker. A job is claimed with a
+    conditional UPDATE so only one worker runs it, and jobs left running by a worker
+    that died (no heartbeat for JOB_STALE_SECONDS) go back to the queue, or fail once
+    they have been started max_attempts times. Old finished jobs are pruned while idle.
+    """
+    def __init__(self, workers=JOB_WORKERS, poll_seconds=JOB_POLL_SECONDS, stale_seconds=JOB_STALE_SECONDS,
+                 max_attempts=JOB_MAX_ATTEMPTS, retention_days=JOB_RETENTION_DAYS):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+        self.retention_days = retention_days
+        self._wakeup = None
+        self._tasks = []
+        self._pruned_at = None
+
+    def submit(self, db, kind, params, user):
+        job = Jobs(
+            job_id = str(uuid.uuid4()),
+            kind = kind,
+            status = QUEUED,
+            params = json.dumps(params or {}),
+            created_by = user,
+            created_at = datetime.now(),
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self):
+        while True:
+            try:
+                job_id = await asyncio.to_thread(self._claim_next)
+            except Exception as e:
+                logging.error(f"Error claiming job: {str(e)}")
+                job_id = None
+
+            if job_id is None:
+                await self._prune_when_due()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job_id)
+
+    def _claim_next(self):
+        db = SessionLocal()
+        try:
+            stale_before = datetime.now() - timedelta(seconds=self.stale_seconds)
+            stale = db.query(Jobs).filter(Jobs.status == RUNNING, or_(Jobs.heartbeat_at == None, Jobs.heartbeat_at < stale_before))
+            stale.filter(Jobs.attempts >= self.max_attempts).update({
+                Jobs.status: FAILED,
+                Jobs.error: f"Abandoned by its worker {self.max_attempts} times",
+                Jobs.finished_at: datetime.now(),
+            }, synchronize_session=False)
+            stale.filter(Jobs.attempts < self.max_attempts).update({Jobs.status: QUEUED}, synchronize_session=False)
+            db.commit()
+
+            candidates = db.query(Jobs.job_id).filter(Jobs.status == QUEUED).order_by(Jobs.created_at).limit(self.workers).all()
+            for (job_id,) in candidates:
+                now = datetime.now()
+                claimed = db.query(Jobs).filter(Jobs.job_id == job_id, Jobs.status == QUEUED).update(
+                    {Jobs.status: RUNNING, Jobs.started_at: now, Jobs.heartbeat_at: now, Jobs.attempts: Jobs.attempts + 1}, synchronize_session=False
+                )
+                db.commit()
+                if claimed:
+                    return job_id
+            return None
+        finally:
+            db.close()
+
+    def prune(self):
+        finished_before = datetime.now() - timedelta(days=self.retention_days)
+        db = SessionLocal()
+        try:
+            pruned = db.query(Jobs).filter(Jobs.status.in_([FINISHED, FAILED]), Jobs.finished_at < finished_before).delete(synchronize_session=False)
+            db.commit()
+            return pruned
+        finally:
+            db.close()
+
+    async def _prune_when_due(self):
+        now = asyncio.get_running_loop().time()
+        if self._pruned_at is not None and now - self._pruned_at < JOB_PRUNE_INTERVAL_SECONDS:
+            return
+        self._pruned_at = now
+        try:
+            pruned = await asyncio.to_thread(self.prune)
+            if pruned:
+                logging.info(f"Pruned {pruned} jobs older than {self.retention_days} days")
+        except Exception as e:
+            logging.error(f"Error pruning jobs: {str(e)}")
+
+    def _heartbeat(self, job_id):
+        db = SessionLocal()
+        try:
+            db.query(Jobs).filter(Jobs.job_id == job_id).update({Jobs.heartbeat_at: datetime.now()}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _finish(self, job_id, result=None, media_type=None, error=None):
+        db = SessionLocal()
+        try:
+            db.query(Jobs).filter(Jobs.job_id == job_id).update({
+                Jobs.status: FAILED if error else FINISHED,
+                Jobs.result: result,
+                Jobs.result_media_type: media_type,
+                Jobs.error: error,
+                Jobs.finished_at: datetime.now(),
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _load(self, job_id):
+        db = SessionLocal()
+        try:
+            job = db.query(Jobs).filter(Jobs.job_id == job_id).first()
+            return job.kind, json.loads(job.params or "{}"), job.created_by
+        finally:
+            db.close()
+
+    async def _run(self, job_id):
+        try:
+            kind, params, user = await asyncio.to_thread(self._load, job_id)
+            run = JOB_KINDS.get(kind)
+            if run is None:
+                raise ValueError(f"Unknown job kind: {kind}")
+
+            future = asyncio.ensure_future(asyncio.to_thread(run, params, user))
+
+            while True:
+                done, _ = await asyncio.wait({future}, timeout=self.stale_seconds / 3)
+                if done:
+                    break
+                await asyncio.to_thread(self._heartbeat, job_id)
+
+            result, media_type = future.result()
+            await asyncio.to_thread(self._finish, job_id, result, media_type)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Job {job_id} failed: {str(e)}")
+            await asyncio.to_thread(self._finish, job_id, None, None, str(e))
+
+
+job_runner = JobRunner()
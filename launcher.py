@@ -0,0 +1,166 @@
+"""
+Gunicorn settings for the backend, loaded with `gunicorn main:app -c python:launcher`.
+
+The worker count follows the CPUs available to the container unless WEB_CONCURRENCY
+is set, and uvloop/httptools are used whenever they are installed. Running
+`python launcher.py bench` starts the server under a few configurations and
+prints the throughput of each one.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+import subprocess
+import http.client
+from importlib.util import find_spec
+
+MAX_WORKERS = int(os.getenv("GUNICORN_MAX_WORKERS", "8"))
+
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+# Uvicorn workers are async, so one per core plus one to cover time spent in the
+# sync DB threadpool. The cap keeps workers * pool size under Postgres' max_connections.
+def worker_count():
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(int(os.getenv("WEB_CONCURRENCY")), 1)
+    return max(min(available_cpus() + 1, MAX_WORKERS), 1)
+
+def event_loop():
+    loop = os.getenv("UVICORN_LOOP", "auto")
+    if loop == "auto":
+        return "uvloop" if find_spec("uvloop") else "asyncio"
+    return loop
+
+def http_protocol():
+    protocol = os.getenv("UVICORN_HTTP", "auto")
+    if protocol == "auto":
+        return "httptools" if find_spec("httptools") else "h11"
+    return protocol
+
+
+# THIS IS THE SECTION THAT DEFINES THE GUNICORN SETTINGS ####################################################
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = worker_count()
+worker_class = "launcher.InventoryWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "false").lower() in ("1", "true", "yes")
+
+
+def on_starting(server):
+    server.log.info(f"Starting {workers} workers (cpus={available_cpus()}, loop={event_loop()}, http={http_protocol()}, preload={preload_app})")
+
+# With preload the app (and the engines in models.py / replicas.py) is created in the master,
+# so each child drops the inherited pools without closing the parent's sockets.
+def post_fork(server, worker):
+    if preload_app:
+        from models import engine
+        from replicas import replica_router
+        engine.dispose(close=False)
+        replica_router.dispose(close=False)
+
+
+try:
+    from uvicorn.workers import UvicornWorker
+
+    class InventoryWorker(UvicornWorker):
+        CONFIG_KWARGS = {"loop": event_loop(), "http": http_protocol()}
+
+except ImportError:
+    pass
+
+
+# THIS IS THE SECTION THAT DEFINES THE BENCHMARK ############################################################
+BENCH_CONFIGS = [
+    {"WEB_CONCURRENCY": "1", "UVICORN_LOOP": "asyncio", "UVICORN_HTTP": "h11"},
+    {"WEB_CONCURRENCY": "1", "UVICORN_LOOP": "auto", "UVICORN_HTTP": "auto"},
+    {"WEB_CONCURRENCY": str(worker_count()), "UVICORN_LOOP": "auto", "UVICORN_HTTP": "auto"},
+    {"WEB_CONCURRENCY": str(worker_count()), "UVICORN_LOOP": "auto", "UVICORN_HTTP": "auto", "GUNICORN_PRELOAD": "true"},
+]
+
+
+def _wait_for_port(host, port, deadline):
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=1)
+            conn.request("GET", "/docs")
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def _load(host, port, path, headers, connections, duration):
+    counts = [0] * connections
+    errors = [0] * connections
+    stop_at = time.monotonic() + duration
+
+    def client(index):
+        conn = http.client.HTTPConnection(host, port, timeout=10)
+        while time.monotonic() < stop_at:
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status < 400:
+                    counts[index] += 1
+                else:
+                    errors[index] += 1
+            except (OSError, http.client.HTTPException):
+                errors[index] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=10)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts), sum(errors)
+
+def benchmark(path="/openapi.json", token=None, port=8765, connections=32, duration=10):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    results = []
+
+    for config in BENCH_CONFIGS:
+        env = {**os.environ, **config, "BIND": f"127.0.0.1:{port}"}
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "main:app", "-c", "python:launcher"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not _wait_for_port("127.0.0.1", port, time.monotonic() + 30):
+                logging.error(f"Server did not start for {config}")
+                continue
+            ok, failed = _load("127.0.0.1", port, path, headers, connections, duration)
+            results.append((config, ok / duration, failed))
+        finally:
+            server.terminate()
+            server.wait()
+
+    for config, rps, failed in results:
+        label = ", ".join(f"{key}={value}" for key, value in config.items())
+        print(f"{rps:10.1f} req/s  {failed:6d} errors  {label}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or benchmark the gunicorn worker setup.")
+    parser.add_argument("command", choices=["show", "bench"])
+    parser.add_argument("--path", default="/openapi.json")
+    parser.add_argument("--token", default=os.getenv("BENCH_TOKEN"))
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--duration", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "show":
+        print(f"cpus={available_cpus()} workers={worker_count()} loop={event_loop()} http={http_protocol()} preload={preload_app}")
+    else:
+        benchmark(args.path, args.token, args.port, args.connections, args.duration)
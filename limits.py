@@ -0,0 +1,174 @@
+import os
+import asyncio
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Every router belongs to a route class with its own concurrency limit, wait queue and
+# statement timeout, so a burst of slow reports can only ever hold the report slots and
+# logins keep theirs. A class is configured with LIMIT_<CLASS>="concurrency,queue,timeout_ms",
+# e.g. LIMIT_REPORTS="4,16,30000". The default concurrencies add up to 40, the size of
+# the threadpool that runs the sync endpoints.
+LIMITS_ENABLED = os.getenv("LIMITS_ENABLED", "true").lower() != "false"
+LIMIT_QUEUE_WAIT_SECONDS = float(os.getenv("LIMIT_QUEUE_WAIT_SECONDS", "5"))
+LIMIT_RETRY_AFTER_SECONDS = os.getenv("LIMIT_RETRY_AFTER_SECONDS", "2")
+
+DEFAULT_LIMITS = {
+    "auth": (8, 64, 5000),
+    "default": (24, 96, 15000),
+    "reports": (4, 16, 30000),
+    "bulk": (4, 8, 55000),
+}
+
+# Router module name -> route class; modules not listed are in the default class
+ROUTER_CLASSES = {
+    "auth": "auth",
+    "reports": "reports",
+    "batch": "bulk",
+    "jobs": "bulk",
+    "archive": "bulk",
+}
+
+
+class RouteLimiter:
+    """
+    Lets at most `concurrency` requests of a route class run at once. Up to `queue` more
+    wait for a slot, for at most LIMIT_QUEUE_WAIT_SECONDS; anything beyond that is turned
+    away straight away with a 503 and a Retry-After header.
+    """
+    def __init__(self, name, concurrency, queue, statement_timeout):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.statement_timeout = statement_timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._slots = asyncio.Semaphore(concurrency)
+
+    def _reject(self):
+        self.rejected += 1
+        raise HTTPException(
+            status_code=503,
+            detail=f"The server is busy with {self.name} requests, try again shortly",
+            headers={"Retry-After": LIMIT_RETRY_AFTER_SECONDS},
+        )
+
+    async def acquire(self):
+        if not self._slots.locked():
+            await self._slots.acquire()
+            self.active += 1
+            return
+
+        if self.waiting >= self.queue:
+            self._reject()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), LIMIT_QUEUE_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            self._reject()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self._slots.release()
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "statement_timeout_ms": self.statement_timeout,
+        }
+
+
+def _load_limiters():
+    limiters = {}
+    for name, default in DEFAULT_LIMITS.items():
+        setting = os.getenv(f"LIMIT_{name.upper()}")
+        concurrency, queue, statement_timeout = [int(value) for value in setting.split(",")] if setting else default
+        limiters[name] = RouteLimiter(name, concurrency, queue, statement_timeout)
+    return limiters
+
+route_limiters = _load_limiters()
+
+def route_class(module_name):
+    return ROUTER_CLASSES.get(module_name.rsplit(".", 1)[-1], "default")
+
+
+# THIS IS THE SECTION THAT DEFINES THE DEPENDENCY ############################################################
+# include_routers() adds this to every router, and router dependencies are solved before the
+# endpoint's own, so a rejected request never takes a threadpool slot or a DB session.
+# The slot is given back once the endpoint returns, unless a LimitedStreamingResponse took
+# it over to give it back when its stream ends.
+
+def route_limit(name):
+    limiter = route_limiters[name]
+
+    async def limit(request: Request):
+        request.state.statement_timeout = limiter.statement_timeout
+        # singleflight.coalesced() takes the slot itself, only for the request that runs the query
+        if not LIMITS_ENABLED or getattr(request.scope.get("endpoint"), "coalesced", False):
+            yield
+            return
+
+        await limiter.acquire()
+        request.state.release_route_slot = limiter.release
+        try:
+            yield
+        finally:
+            release = request.state.release_route_slot
+            request.state.release_route_slot = None
+            if release is not None:
+                release()
+
+    return limit
+
+
+class LimitedStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse that keeps the request's route slot until the whole body has been
+    sent, so a slow stream counts against its route class for as long as it reads. Build it
+    as the endpoint's last step: the slot is only released by sending the response.
+    """
+    def __init__(self, request, content, **kwargs):
+        super().__init__(content, **kwargs)
+        self._release = getattr(request.state, "release_route_slot", None)
+        request.state.release_route_slot = None
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self._release is not None:
+                self._release()
+                self._release = None
+
+
+# THIS IS THE SECTION THAT DEFINES THE STATEMENT TIMEOUT #####################################################
+# get_db() and get_read_db() copy the route class's timeout into session.info, and it is set
+# at the start of every transaction the session begins. SET LOCAL only lasts until that
+# transaction ends. Only PostgreSQL has statement_timeout, other databases run without one.
+
+@event.listens_for(Session, "after_begin")
+def _apply_statement_timeout(session, transaction, connection):
+    timeout = session.info.get("statement_timeout")
+    if timeout and connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+# 57014 is query_canceled, which is what PostgreSQL raises when statement_timeout fires
+def is_statement_timeout(error):
+    return getattr(getattr(error, "orig", None), "pgcode", None) == "57014"
+
+async def statement_timeout_handler(request, exc):
+    if not is_statement_timeout(exc):
+        raise exc
+    return JSONResponse(
+        {"detail": "The request took too long and was cancelled"},
+        status_code=503,
+        headers={"Retry-After": LIMIT_RETRY_AFTER_SECONDS},
+    )
@@ -2,8 +2,8 @@ import os
 from dotenv import load_dotenv
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
-from sqlalchemy import create_engine, Column, Integer, String, Text, Boolean, Float, DateTime, Date, Enum
-from sqlalchemy import ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Text, Boolean, Float, DateTime, Date, Enum, Index, LargeBinary, Table
+from sqlalchemy import ForeignKey, text
 from datetime import datetime, timedelta, timezone, date
 from pydantic import BaseModel
 from typing import List, Optional
@@ -60,9 +60,10 @@ class Devices(Base):
     deployment_date = Column(Date, nullable=True)
     status_id = Column(Integer, ForeignKey("system_status.status_id"), nullable=True)
     division_id = Column(Integer, ForeignKey("division.division_id"), nullable=True)
-    client_id = Column(Integer, nullable=True)
+    client_id = Column(Integer, nullable=True, index=True)
     added_by = Column(String(255), nullable=True)
     last_updated_by = Column(String(255), nullable=True)
+    repair_started_on = Column(Date, nullable=True)
     repaired_date = Column(Date, nullable=True)
     repaired_by = Column(String(255), nullable=True)
     bos_date = Column(Date, nullable=True)
@@ -70,9 +71,41 @@ class Devices(Base):
     deployed_by = Column(String(255), nullable=True)
     assigned_on = Column(Date, nullable=True)
     unassigned_on = Column(Date, nullable=True)
+    # Bumped by every ORM update; an UPDATE or DELETE that finds another version raises StaleDataError
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     comments = relationship("Comments", back_populates="device", cascade="all, delete-orphan", passive_deletes=True)
 
+    # Partial indexes for the two dashboard views. On Postgres they also INCLUDE the devices
+    # columns those views select; the joined client fields still need the table rows.
+    __table_args__ = (
+        Index(
+            "ix_devices_unassigned", "devices_id",
+            postgresql_where=text("client_id IS NULL"),
+            sqlite_where=text("client_id IS NULL"),
+            postgresql_include=[
+                "category", "brand", "model", "serial_number", "inventory_number",
+                "delivery_date", "deployment_date", "status_id", "division_id", "version",
+            ],
+        ),
+        Index(
+            "ix_devices_in_repair", "devices_id",
+            postgresql_where=text("status_id = 2"),
+            sqlite_where=text("status_id = 2"),
+            postgresql_include=[
+                "category", "brand", "model", "serial_number", "inventory_number",
+                "delivery_date", "division_id", "client_id",
+            ],
+        ),
+        # Only beyond service devices, which archive.py scans for
+        Index(
+            "ix_devices_bos_date", "bos_date",
+            postgresql_where=text("bos_date IS NOT NULL"),
+            sqlite_where=text("bos_date IS NOT NULL"),
+        ),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
 class SystemStatus(Base):
     __tablename__ = "system_status"
 
@@ -111,6 +144,11 @@ class Comments(Base):
 
     device = relationship(Devices, back_populates="comments")
 
+    # Backs per-device comment pages (newest first) and the grouped comment counts
+    __table_args__ = (
+        Index("ix_comments_devices_id_comment_id", "devices_id", "comment_id"),
+    )
+
 
 class Laptops(Base):
     __tablename__ = "laptop"
@@ -128,9 +166,9 @@ class Laptops(Base):
     antivirus = Column(String(255), nullable=True)
     pdf_reader = Column(String(255), nullable=True)
     warranty_start_date = Column(Date, nullable=True)
-    warranty_end_date = Column(Date, nullable=True)
+    warranty_end_date = Column(Date, nullable=True, index=True)
     return_date = Column(Date, nullable=True)
-    devices_id = Column(Integer, ForeignKey("devices.devices_id"))
+    devices_id = Column(Integer, ForeignKey("devices.devices_id"), index=True)
 
     device = relationship("Devices", backref="laptop", uselist=False)
 
@@ -145,9 +183,9 @@ class Tablets(Base):
     hard_disk_capacity = Column(String(255), nullable=True)
     memory_capacity = Column(String(255), nullable=True)
     warranty_start_date = Column(Date, nullable=True)
-    warranty_end_date = Column(Date, nullable=True)
+    warranty_end_date = Column(Date, nullable=True, index=True)
     return_date = Column(Date, nullable=True)
-    devices_id = Column(Integer, ForeignKey("devices.devices_id"))
+    devices_id = Column(Integer, ForeignKey("devices.devices_id"), index=True)
 
     device = relationship("Devices", backref="tablet", uselist=False)
 
@@ -222,6 +260,99 @@ class Roles(Base):
     role_name = Column(String(255), nullable=True)
     description = Column(String(255), nullable=True)
 
+class DeviceEvents(Base):
+    __tablename__ = "device_events"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    devices_id = Column(Integer, nullable=False, index=True)
+    serial_number = Column(String(255), nullable=True)
+    action = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=True)
+    changed_by = Column(String(255), nullable=True)
+    changed_at = Column(DateTime, nullable=True)
+
+# One row per device with the list view columns and its searchable text, kept in sync by
+# search.refresh_device_search() so typeahead does not need the four table join
+class DeviceSearch(Base):
+    __tablename__ = "device_search"
+
+    devices_id = Column(Integer, primary_key=True)
+    category = Column(String(255), nullable=True)
+    brand = Column(String(255), nullable=True)
+    model = Column(String(255), nullable=True)
+    serial_number = Column(String(255), nullable=True, index=True)
+    inventory_number = Column(String(255), nullable=True)
+    status_id = Column(Integer, nullable=True)
+    division_id = Column(Integer, nullable=True)
+    client_id = Column(Integer, nullable=True)
+    status_description = Column(String(255), nullable=True)
+    division_name = Column(String(255), nullable=True)
+    client_name = Column(String(511), nullable=True)
+    search_text = Column(Text, nullable=False)
+
+class Jobs(Base):
+    __tablename__ = "jobs"
+
+    job_id = Column(String(36), primary_key=True)
+    kind = Column(String(255), nullable=False)
+    status = Column(String(20), nullable=False, index=True)
+    params = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)
+    result_media_type = Column(String(255), nullable=True)
+    error = Column(Text, nullable=True)
+    created_by = Column(String(255), nullable=True)
+    created_at = Column(DateTime, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    # How many times a worker has started the job, see JOB_MAX_ATTEMPTS
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+
+# Responses to POST/PUT requests sent with an Idempotency-Key, replayed when the request is retried
+class IdempotencyKeys(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(64), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    headers = Column(Text, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+# Archive tier for devices that went beyond service, moved out of the live tables by archive.py.
+# Each archive table mirrors its live table without foreign keys, unique constraints or
+# autoincrement, so archived rows keep their ids and can be restored unchanged.
+def archive_table(source, *extra):
+    return Table(
+        f"archived_{source.name}", Base.metadata,
+        *[
+            Column(
+                column.name, column.type,
+                primary_key=column.primary_key,
+                nullable=column.nullable,
+                autoincrement=False,
+                index=column.name == "devices_id" and not column.primary_key,
+            )
+            for column in source.columns
+        ],
+        *extra,
+    )
+
+archived_devices = archive_table(
+    Devices.__table__,
+    Column("archived_on", Date, nullable=False),
+    Column("archived_by", String(255), nullable=True),
+    Index("ix_archived_devices_serial_number", "serial_number"),
+)
+
+# Live table -> archive table, for every table whose rows belong to a device
+archived_details = {
+    source: archive_table(source)
+    for source in (Laptops.__table__, Tablets.__table__, MouseKeyboards.__table__, Printers.__table__, CRAVEquipments.__table__, Comments.__table__)
+}
+
 
 
 
@@ -234,6 +365,15 @@ class CreateUserRequest(BaseModel):
     password: str
     role_id: int
 
+# What /users/me/ returns: the cached user record, which has no password hash
+class UserOut(BaseModel):
+    user_id: int
+    email: Optional[str] = None
+    firstname: Optional[str] = None
+    lastname: Optional[str] = None
+    role_id: Optional[int] = None
+    active: Optional[bool] = None
+
 class CreateClientRequest(BaseModel):
     firstname: str
     lastname: str
@@ -346,6 +486,19 @@ class ChangeUserPasswordRequest(BaseModel):
 class UpdateStatusRequest(BaseModel):
     serial_number: str
     new_status: int
+    row_version: Optional[int] = None
+
+class JobRequest(BaseModel):
+    kind: str
+    params: Optional[dict] = None
+
+class BatchOperation(BaseModel):
+    op: str
+    params: dict = {}
+
+class BatchRequest(BaseModel):
+    mode: str = "atomic"
+    operations: List[BatchOperation]
 
 
 
@@ -0,0 +1,115 @@
+import os
+import asyncio
+import logging
+from sqlalchemy import event
+from models import SessionLocal, DeviceEvents
+
+# "local" publishes each worker's own commits to its own subscribers. "db" makes every
+# worker tail the device_events table instead, so clients see writes from all workers.
+PUSH_BROKER = os.getenv("PUSH_BROKER", "local")
+PUSH_POLL_SECONDS = float(os.getenv("PUSH_POLL_SECONDS", "1"))
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("PUSH_QUEUE_SIZE", "1000"))
+
+
+class Hub:
+    """
+    In-process fan-out of device events to connected clients. Publishing is safe from
+    the threadpool the sync endpoints run in. A subscriber that falls too far behind
+    gets None and is expected to resync from /changes/.
+    """
+    def __init__(self):
+        self._subscribers = set()
+        self._loop = None
+
+    def bind(self, loop):
+        self._loop = loop
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, events):
+        if self._loop is None or not events:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is self._loop:
+            self._deliver(events)
+        else:
+            self._loop.call_soon_threadsafe(self._deliver, events)
+
+    def _deliver(self, events):
+        for queue in list(self._subscribers):
+            for item in events:
+                try:
+                    queue.put_nowait(item)
+                except asyncio.QueueFull:
+                    self.unsubscribe(queue)
+                    queue.get_nowait()
+                    queue.put_nowait(None)
+                    break
+
+
+hub = Hub()
+
+
+# THIS IS THE SECTION THAT DEFINES THE BROKERS ##############################################################
+# record_device_event() queues its rows in session.info and they are inserted just before
+# COMMIT. Once flushed they have a seq, and once the transaction commits they are published;
+# a rollback of the whole transaction drops them.
+@event.listens_for(SessionLocal, "after_flush_postexec")
+def _collect_flushed_events(session, flush_context):
+    from device_events import event_to_dict
+    pending = session.info.pop("device_events", [])
+    session.info.setdefault("flushed_device_events", []).extend(event_to_dict(item) for item in pending)
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_committed_events(session):
+    committed = session.info.pop("flushed_device_events", [])
+    if PUSH_BROKER == "local":
+        hub.publish(committed)
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _drop_rolled_back_events(session, previous_transaction):
+    if previous_transaction.nested:
+        return
+    session.info.pop("device_events", None)
+    session.info.pop("flushed_device_events", None)
+
+
+def _events_after(seq, limit=500):
+    from device_events import event_to_dict
+    db = SessionLocal()
+    try:
+        events = db.query(DeviceEvents).filter(DeviceEvents.seq > seq).order_by(DeviceEvents.seq).limit(limit).all()
+        return [event_to_dict(item) for item in events]
+    finally:
+        db.close()
+
+def _latest_seq():
+    db = SessionLocal()
+    try:
+        latest = db.query(DeviceEvents.seq).order_by(DeviceEvents.seq.desc()).first()
+        return latest[0] if latest else 0
+    finally:
+        db.close()
+
+async def tail_device_events():
+    last_seq = await asyncio.to_thread(_latest_seq)
+    while True:
+        try:
+            events = await asyncio.to_thread(_events_after, last_seq)
+            if events:
+                last_seq = events[-1]["seq"]
+                hub.publish(events)
+                continue
+        except Exception as e:
+            logging.error(f"Error tailing device events: {str(e)}")
+        await asyncio.sleep(PUSH_POLL_SECONDS)
@@ -0,0 +1,138 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from itertools import count
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+from models import SessionLocal
+from cache import cache
+
+load_dotenv()
+
+# DATABASE_READ_URL holds one or more comma separated replica urls. When it is unset
+# every read goes to the primary in DATABASE_URL.
+READ_URLS = [url.strip() for url in os.getenv("DATABASE_READ_URL", "").split(",") if url.strip()]
+HEALTH_CHECK_INTERVAL = float(os.getenv("REPLICA_HEALTH_CHECK_INTERVAL", "10"))
+CONNECT_TIMEOUT = int(os.getenv("REPLICA_CONNECT_TIMEOUT", "2"))
+STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+
+class Replica:
+    def __init__(self, url):
+        # A replica that is down has to fail fast rather than hang until the OS gives up on the
+        # connection; only the PostgreSQL drivers take connect_timeout
+        connect_args = {"connect_timeout": CONNECT_TIMEOUT} if make_url(url).get_backend_name() == "postgresql" else {}
+        self.engine = create_engine(url, pool_pre_ping=True, connect_args=connect_args)
+        self.Session = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.healthy = True
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            if not self.healthy:
+                logging.info(f"Read replica {self.engine.url!r} is back")
+            self.healthy = True
+        except Exception as e:
+            if self.healthy:
+                logging.error(f"Read replica {self.engine.url!r} failed health check: {str(e)}")
+            self.healthy = False
+        return self.healthy
+
+
+class ReplicaRouter:
+    """
+    Hands out sessions for read-only endpoints: replicas in round-robin order,
+    skipping unhealthy ones, and the primary for a user who wrote within the
+    last STICKY_SECONDS so they always read their own writes. The time of the
+    last write is also kept in the shared tier of cache.py when there is one,
+    so a read that lands on another worker still goes to the primary. Replicas
+    are health-checked in the background between start() and stop(), so a
+    read never waits on a replica that is down.
+    """
+    def __init__(self, urls, sticky_seconds=STICKY_SECONDS, store=None):
+        self.replicas = [Replica(url) for url in urls]
+        self.sticky_seconds = sticky_seconds
+        self.store = store
+        self._next = count()
+        self._last_write = {}
+        self._lock = threading.Lock()
+        self._health_task = None
+
+        if self.replicas and self.store is None:
+            logging.warning("No shared cache tier (CACHE_BACKEND=memory), read-your-writes only holds within one worker")
+
+    async def start(self):
+        if self.replicas and self._health_task is None:
+            self._health_task = asyncio.create_task(self._check_forever())
+
+    async def stop(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+
+    def check_health(self):
+        for replica in self.replicas:
+            replica.check()
+
+    async def _check_forever(self):
+        while True:
+            await asyncio.to_thread(self.check_health)
+            await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+
+    def mark_write(self, user_key):
+        with self._lock:
+            self._last_write[user_key] = time.monotonic()
+        if self.store is not None:
+            try:
+                # Wall clock time, the monotonic clock is not comparable between processes
+                self.store.set(f"last-write:{user_key}", time.time(), self.sticky_seconds)
+            except Exception as e:
+                logging.error(f"Could not share the last write of {user_key}: {str(e)}")
+
+    def is_sticky(self, user_key):
+        if user_key is None:
+            return False
+        with self._lock:
+            written_at = self._last_write.get(user_key)
+            if written_at is not None:
+                if time.monotonic() - written_at <= self.sticky_seconds:
+                    return True
+                del self._last_write[user_key]
+
+        if self.store is None:
+            return False
+        try:
+            written_at = self.store.get(f"last-write:{user_key}")
+        except Exception as e:
+            logging.error(f"Could not read the last write of {user_key}: {str(e)}")
+            return False
+        return isinstance(written_at, float) and time.time() - written_at <= self.sticky_seconds
+
+    def read_session(self, user_key=None):
+        if self.replicas and not self.is_sticky(user_key):
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[next(self._next) % len(self.replicas)]
+                if replica.healthy:
+                    return replica.Session()
+        return SessionLocal()
+
+    def dispose(self, close=True):
+        for replica in self.replicas:
+            replica.engine.dispose(close=close)
+
+
+replica_router = ReplicaRouter(READ_URLS, store=cache.shared)
+
+# get_current_user stores the caller's email in session.info["user"], so any commit on a
+# primary session starts that user's read-your-writes window.
+@event.listens_for(SessionLocal, "after_commit")
+def _mark_user_write(session):
+    user_key = session.info.get("user")
+    if user_key is not None:
+        replica_router.mark_write(user_key)
@@ -0,0 +1,46 @@
+import os
+import logging
+from importlib import import_module
+from fastapi import Depends
+from limits import route_class, route_limit
+
+# Every entry is the dotted path of a module exposing an APIRouter named `router`.
+# Modules are only imported when the app is built, and any listed in the
+# DISABLED_ROUTERS env var (comma separated, e.g. "reports") are never imported.
+ROUTER_MODULES = [
+    "routers.auth",
+    "routers.devices",
+    "routers.clients",
+    "routers.reference",
+    "routers.reports",
+    "routers.jobs",
+    "routers.events",
+    "routers.batch",
+    "routers.archive",
+]
+
+# Loaded router modules may define async startup() / shutdown() hooks, which the
+# app lifespan runs through start_routers() and stop_routers().
+_loaded = []
+
+def include_routers(application, modules=None):
+    disabled = {name.strip() for name in os.getenv("DISABLED_ROUTERS", "").split(",") if name.strip()}
+
+    for path in modules or ROUTER_MODULES:
+        if path.rsplit(".", 1)[-1] in disabled:
+            logging.info(f"Router {path} disabled")
+            continue
+        module = import_module(path)
+        # Each router runs under its route class's concurrency limit and statement timeout
+        application.include_router(module.router, dependencies=[Depends(route_limit(route_class(path)))])
+        _loaded.append(module)
+
+async def start_routers():
+    for module in _loaded:
+        if hasattr(module, "startup"):
+            await module.startup()
+
+async def stop_routers():
+    for module in reversed(_loaded):
+        if hasattr(module, "shutdown"):
+            await module.shutdown()
@@ -0,0 +1,39 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from dependencies import get_db, user_dependency
+from archive import archive_devices, restore_device, archive_forever, RestoreConflict, ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_INTERVAL_SECONDS
+
+router = APIRouter(tags=["archive"])
+
+_archive_task = None
+
+
+async def startup():
+    global _archive_task
+    if ARCHIVE_INTERVAL_SECONDS > 0:
+        _archive_task = asyncio.create_task(archive_forever())
+
+async def shutdown():
+    if _archive_task is not None:
+        _archive_task.cancel()
+        await asyncio.gather(_archive_task, return_exceptions=True)
+
+
+# Archives one batch; "more" means there are probably more to go. The archive-devices job runs them all.
+@router.post('/archive-devices/')
+def archive_devices_view(current_user: user_dependency, older_than_days: int = ARCHIVE_AFTER_DAYS, db: Session=Depends(get_db)):
+    serial_numbers = archive_devices(db, current_user.firstname + " " + current_user.lastname, older_than_days)
+    return {"archived": len(serial_numbers), "serial_numbers": serial_numbers, "more": len(serial_numbers) == ARCHIVE_BATCH_SIZE}
+
+@router.post('/restore-device/')
+def restore_device_view(current_user: user_dependency, serial_number: str, db: Session=Depends(get_db)):
+    try:
+        device = restore_device(db, serial_number, current_user.firstname + " " + current_user.lastname)
+    except RestoreConflict:
+        raise HTTPException(status_code=409, detail="A live device already uses this device's model")
+
+    if device is None:
+        raise HTTPException(status_code=404, detail="Archived device not found")
+
+    return {"message": "Device has been restored", "devices_id": device.devices_id, "row_version": device.version}
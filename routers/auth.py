@@ -0,0 +1,122 @@
+from datetime import timedelta, date
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session
+from models import Users, CreateUserRequest, UserOut, ChangePasswordRequest, ChangeUserPasswordRequest, Token
+from dependencies import (
+    ACCESS_TOKEN_EXPIRE_MINUTES, get_db, get_read_db, db_dependency, user_dependency,
+    get_user, get_password_hash, verify_password, authenticate_user, create_access_token,
+)
+from cache import cache
+
+router = APIRouter(tags=["auth"])
+
+
+@router.post("/create-user/", status_code=status.HTTP_201_CREATED)
+async def create_user(user_model: CreateUserRequest, db: Session=Depends(get_db)):
+    db_user = get_user(db, user_model.email)
+    if db_user:
+        raise HTTPException(status_code=400, detail="User already exists")
+    user = Users(
+            firstname = user_model.firstname,
+            lastname = user_model.lastname,
+            email = user_model.email,
+            password = get_password_hash(user_model.password),
+            role_id = user_model.role_id,
+            active = True,
+            date_created = date.today(),
+            last_updated = None,
+    )
+    db.add(user)
+    db.commit()
+    cache.invalidate("users")
+    db.refresh(user)
+    return {"message": "User created successfully"}
+
+@router.post("/change-password/", status_code=status.HTTP_200_OK)
+async def change_password(password_set: ChangePasswordRequest, current_user: user_dependency, db: Session=Depends(get_db)):
+    user = db.query(Users).filter(Users.email == current_user.email).first()
+
+    if user:
+        if verify_password(password_set.old_password, user.password):
+            new_hashed_password = get_password_hash(password_set.new_password)
+            user.password = new_hashed_password
+            db.commit()
+            cache.invalidate("users")
+            db.refresh(user)
+            return {"message": "Password updated successfully"}
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Incorrect password"
+            )
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+
+@router.post("/change-user-password/", status_code=status.HTTP_200_OK)
+async def change_user_password(user_password_set: ChangeUserPasswordRequest, current_user: user_dependency, db: Session=Depends(get_db)):
+    user = db.query(Users).filter(Users.email == user_password_set.email).first()
+
+    if user:
+        new_hashed_password = get_password_hash(user_password_set.new_password)
+        user.password = new_hashed_password
+        db.commit()
+        cache.invalidate("users")
+        db.refresh(user)
+        return {"message": "Password updated successfully"}
+    
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+
+@router.delete('/delete-user/')
+def delete_user_view(first_name: str, last_name: str, email: str, current_user: user_dependency, db: Session=Depends(get_db)):
+    deleted = db.query(Users).filter(Users.firstname == first_name, Users.lastname == last_name, Users.email == email).delete()
+    db.commit()
+    cache.invalidate("users")
+
+    if deleted == 0:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return {"message": "User has been deleted"}
+
+
+
+
+@router.post("/token")
+async def login_for_access_token(db: db_dependency, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
+    user = authenticate_user(db, form_data.username, form_data.password)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.email, "firstname": user.firstname, "lastname": user.lastname, "role": user.role_id}, expires_delta=access_token_expires
+    )
+    return Token(access_token=access_token, token_type="bearer")
+
+@router.get("/users/me/", response_model=UserOut)
+async def read_users_me(current_user: user_dependency):
+    return current_user
+
+
+@router.get('/get-users/')
+def get_users_view(current_user: user_dependency, name: Optional[str] = None, db: Session=Depends(get_read_db)):
+
+    if name:
+        search = f"%{name.strip()}%"
+        query = db.query(Users).filter((Users.firstname + " " + Users.lastname).ilike(search)).all()
+        return query
+    else:
+        return db.query(Users).all()
@@ -0,0 +1,159 @@
+import inspect
+import functools
+from anyio import from_thread
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy.orm import Session
+from models import Devices, BatchRequest
+from dependencies import get_db, user_dependency
+from cache import invalidate_device, deferred_device_invalidations
+from routers import devices, clients
+
+router = APIRouter(tags=["batch"])
+
+MAX_OPERATIONS = 100
+
+# Operation name -> existing handler. Handlers keep their own validation and error
+# handling; the batch only decides when the transaction really commits.
+BATCH_OPERATIONS = {
+    "add-device": devices.add_device_view,
+    "add-laptop": devices.add_laptop_view,
+    "add-tablet": devices.add_tablet_view,
+    "add-mouse-keyboard": devices.add_mouse_keyboard_view,
+    "add-printer": devices.add_printer_view,
+    "add-crav-equipment": devices.add_crav_equipment_view,
+    "assign-device": devices.assign_device_view,
+    "unassign-item": devices.unassign_item_view,
+    "update-status": devices.update_status,
+    "delete-item": devices.delete_item_view,
+    "add-comments": devices.add_comments_view,
+    "create-client": clients.create_client,
+}
+
+
+class BatchSession:
+    """
+    Session handed to handlers inside a batch. commit() only flushes and rollback() is
+    left to the batch, so every operation runs in the batch's single transaction.
+    """
+    def __init__(self, session):
+        self._session = session
+
+    def commit(self):
+        self._session.flush()
+
+    def rollback(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+def _handler_kwargs(handler, params, current_user, db):
+    kwargs = {}
+    for name, parameter in inspect.signature(handler).parameters.items():
+        if name == "current_user":
+            kwargs[name] = current_user
+        elif name == "db":
+            kwargs[name] = db
+        elif inspect.isclass(parameter.annotation) and issubclass(parameter.annotation, BaseModel):
+            kwargs[name] = parameter.annotation(**params)
+        elif name in params:
+            kwargs[name] = TypeAdapter(parameter.annotation).validate_python(params[name])
+        elif parameter.default is inspect.Parameter.empty:
+            raise HTTPException(status_code=422, detail=f"Missing parameter: {name}")
+    return kwargs
+
+def _run_operation(operation, current_user, db):
+    handler = BATCH_OPERATIONS.get(operation.op)
+    if handler is None:
+        raise HTTPException(status_code=400, detail=f"Unknown operation: {operation.op}")
+
+    try:
+        kwargs = _handler_kwargs(handler, operation.params, current_user, BatchSession(db))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=jsonable_encoder(e.errors()))
+
+    # The batch runs in a threadpool thread, so async handlers are handed back to the event loop
+    if inspect.iscoroutinefunction(handler):
+        result = from_thread.run(functools.partial(handler, **kwargs))
+    else:
+        result = handler(**kwargs)
+    db.flush()
+    return jsonable_encoder(result)
+
+
+# Parameters that name the device an operation writes to
+DEVICE_PARAMS = ("serial_number", "device_sn")
+
+# Locks every device the batch touches up front, in id order, so two overlapping batches
+# queue behind each other instead of deadlocking halfway through
+def _lock_devices(db, operations):
+    serials = {
+        str(operation.params[name])
+        for operation in operations
+        for name in DEVICE_PARAMS
+        if name in operation.params
+    }
+    if serials:
+        db.query(Devices.devices_id).filter(Devices.serial_number.in_(serials)).order_by(Devices.devices_id).with_for_update().all()
+
+
+# A plain def, so the row locks and the transaction are waited on in the threadpool, not the event loop
+@router.post('/batch/')
+def batch_view(batch: BatchRequest, current_user: user_dependency, db: Session=Depends(get_db)):
+    """
+    Runs an ordered list of operations in one transaction.
+
+    mode "atomic" commits only if every operation succeeds and stops at the first
+    failure. mode "independent" wraps each operation in a savepoint, so failed
+    operations are rolled back on their own and the rest are committed together.
+    """
+    if batch.mode not in ("atomic", "independent"):
+        raise HTTPException(status_code=400, detail="mode must be 'atomic' or 'independent'")
+    if len(batch.operations) > MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"A batch can hold at most {MAX_OPERATIONS} operations")
+
+    _lock_devices(db, batch.operations)
+
+    results = []
+    failed = False
+    # Serials whose cached details the committed operations changed
+    affected = set()
+
+    for index, operation in enumerate(batch.operations):
+        if failed and batch.mode == "atomic":
+            results.append({"index": index, "op": operation.op, "status": "skipped"})
+            continue
+
+        savepoint = db.begin_nested() if batch.mode == "independent" else None
+        try:
+            with deferred_device_invalidations() as serials:
+                result = _run_operation(operation, current_user, db)
+            if savepoint is not None:
+                savepoint.commit()
+            affected |= serials
+            results.append({"index": index, "op": operation.op, "status": 200, "result": result})
+        except HTTPException as e:
+            if savepoint is not None:
+                savepoint.rollback()
+            failed = True
+            results.append({"index": index, "op": operation.op, "status": e.status_code, "detail": e.detail})
+        except Exception as e:
+            if savepoint is not None:
+                savepoint.rollback()
+            failed = True
+            results.append({"index": index, "op": operation.op, "status": 400, "detail": str(e)})
+
+    if failed and batch.mode == "atomic":
+        db.rollback()
+        committed = False
+    else:
+        db.commit()
+        committed = True
+        # Only now is the change visible, so a read between a handler and the commit cannot re-cache old data
+        for serial_number in affected:
+            invalidate_device(serial_number)
+
+    return {"mode": batch.mode, "committed": committed, "results": results}
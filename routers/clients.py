@@ -0,0 +1,95 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import Clients, Devices, CreateClientRequest
+from dependencies import get_db, get_read_db, get_client, user_dependency
+from search import refresh_device_search
+from cache import row_to_dict
+
+router = APIRouter(tags=["clients"])
+
+
+@router.post("/create-client/", status_code=status.HTTP_201_CREATED)
+async def create_client(client_model: CreateClientRequest, current_user: user_dependency, db: Session=Depends(get_db)):
+    db_client = get_client(db, client_model.email)
+    if db_client:
+        raise HTTPException(status_code=400, detail="Client already exists")
+    client = Clients(
+            firstname = client_model.firstname,
+            lastname = client_model.lastname,
+            email = client_model.email,
+            phone_number = client_model.phone_number,
+            position = client_model.position,
+            division_id = client_model.division_id,
+            date_created = date.today(),
+            added_by = current_user.firstname + " " + current_user.lastname,
+    )
+    db.add(client)
+    db.commit()
+    db.refresh(client)
+    return {"message": "Client created successfully"}
+
+@router.delete('/delete-client/')
+def delete_client_view(first_name: str, last_name: str, current_user: user_dependency, db: Session=Depends(get_db)):
+
+    client_ids = db.query(Clients.client_id).filter(Clients.firstname == first_name, Clients.lastname == last_name)
+    affected = [row[0] for row in db.query(Devices.devices_id).filter(Devices.client_id.in_(client_ids.scalar_subquery()))]
+
+    deleted = db.query(Clients).filter(Clients.firstname == first_name, Clients.lastname == last_name).delete()
+    refresh_device_search(db, affected)
+    db.commit()
+
+    if deleted == 0:
+        raise HTTPException(status_code=404, detail="Client not found")
+    
+    return {"message": "Client has been deleted"}
+
+@router.get('/get-clients/')
+def get_client_view(current_user: user_dependency, name: Optional[str] = None, include_devices: bool = False, db: Session=Depends(get_read_db)):
+
+    if name:
+        search = f"%{name.strip()}%"
+        clients = db.query(Clients).filter((Clients.firstname + " " + Clients.lastname).ilike(search)).all()
+    else:
+        clients = db.query(Clients).all()
+
+    if not include_devices:
+        return clients
+
+    # Two queries for the whole page, both keyed on Devices.client_id: counts per category
+    # and a compact list of what each client holds
+    assigned = Devices.client_id != None
+    if name:
+        assigned = Devices.client_id.in_([client.client_id for client in clients])
+
+    counts = {}
+    for client_id, category, count in (
+        db.query(Devices.client_id, Devices.category, func.count(Devices.devices_id))
+        .filter(assigned)
+        .group_by(Devices.client_id, Devices.category)
+    ):
+        counts.setdefault(client_id, {})[category] = count
+
+    devices = {}
+    for device in (
+        db.query(Devices.client_id, Devices.devices_id, Devices.category, Devices.model, Devices.serial_number)
+        .filter(assigned)
+        .order_by(Devices.client_id, Devices.devices_id)
+    ):
+        devices.setdefault(device.client_id, []).append({
+            "devices_id": device.devices_id,
+            "category": device.category,
+            "model": device.model,
+            "serial_number": device.serial_number,
+        })
+
+    result = []
+    for client in clients:
+        item = row_to_dict(client)
+        item["device_counts"] = counts.get(client.client_id, {})
+        item["device_count"] = sum(item["device_counts"].values())
+        item["devices"] = devices.get(client.client_id, [])
+        result.append(item)
+    return result
@@ -0,0 +1,938 @@
+from datetime import datetime, date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import or_, desc, func
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from models import *
+from dependencies import get_db, get_read_db, user_dependency
+from device_events import record_device_event, event_to_dict
+from cache import device_detail_cache, device_tags, invalidate_device
+from search import refresh_device_search, remove_device_search, search_devices
+from fieldsets import parse_fields, list_columns, list_joins, row_to_item, device_out
+
+router = APIRouter(tags=["devices"])
+
+
+@router.post('/add-device/', response_model=DeviceRequest)
+def add_device_view(device: DeviceRequest, current_user: user_dependency, db: Session=Depends(get_db)):
+    try:
+        device_section = Devices(
+            category = device.category,
+            brand = device.brand,
+            model = device.model,
+            serial_number = device.serial_number,
+            inventory_number = device.inventory_number,
+            delivery_date = device.delivery_date,
+            deployment_date = device.deployment_date,
+            status_id = device.status_id,
+            division_id = device.division_id,
+            added_by = current_user.firstname + " " + current_user.lastname,
+        )
+
+        db.add(device_section)
+        db.flush()
+        record_device_event(db, device_section, "added", current_user.firstname + " " + current_user.lastname)
+        refresh_device_search(db, [device_section.devices_id])
+        db.commit()
+        invalidate_device(device.serial_number)
+        db.refresh(device_section)
+        return {"message": "Device Has Been Added"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post('/add-laptop/', response_model=DeviceRequest)
+def add_laptop_view(laptop: LaptopRequest, current_user: user_dependency, db: Session=Depends(get_db)):
+    try:
+        device_section = Devices(
+            category = laptop.category,
+            brand = laptop.brand,
+            model = laptop.model,
+            serial_number = laptop.serial_number,
+            inventory_number = laptop.inventory_number,
+            delivery_date = laptop.delivery_date,
+            deployment_date = laptop.deployment_date,
+            status_id = laptop.status_id,
+            division_id = laptop.division_id,
+            added_by = current_user.firstname + " " + current_user.lastname,
+        )
+
+        db.add(device_section)
+        db.flush()
+        record_device_event(db, device_section, "added", current_user.firstname + " " + current_user.lastname)
+        refresh_device_search(db, [device_section.devices_id])
+
+        laptop_section = Laptops(
+            
+            cpu_type_id = laptop.cpu_type_id,
+            hard_disk_capacity = laptop.hard_disk_capacity,
+            memory_capacity = laptop.memory_capacity,
+            processor_speed = laptop.processor_speed,
+            processor_type = laptop.processor_type,
+            computer_name = laptop.computer_name,
+            mac_address = laptop.mac_address,
+            operating_system = laptop.operating_system,
+            microsoft_office_version = laptop.microsoft_office_version,
+            antivirus = laptop.antivirus,
+            pdf_reader = laptop.pdf_reader,
+            warranty_start_date = laptop.warranty_start_date,
+            warranty_end_date = laptop.warranty_end_date,
+            return_date = laptop.return_date,
+            devices_id = device_section.devices_id,
+        )
+
+        db.add(laptop_section)
+        db.commit()
+        invalidate_device(laptop.serial_number)
+        db.refresh(laptop_section)
+        return {"message": "Laptop Has Been Added"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    
+
+@router.post('/add-tablet/', response_model=DeviceRequest)
+def add_tablet_view(tablet: TabletRequest, current_user: user_dependency, db: Session=Depends(get_db)):
+    try:
+        device_section = Devices(
+            category = tablet.category,
+            brand = tablet.brand,
+            model = tablet.model,
+            serial_number = tablet.serial_number,
+            inventory_number = tablet.inventory_number,
+            delivery_date = tablet.delivery_date,
+            deployment_date = tablet.deployment_date,
+            status_id = tablet.status_id,
+            division_id = tablet.division_id,
+            added_by = current_user.firstname + " " + current_user.lastname,
+        )
+
+        db.add(device_section)
+        db.flush()
+        record_device_event(db, device_section, "added", current_user.firstname + " " + current_user.lastname)
+        refresh_device_search(db, [device_section.devices_id])
+
+        tablet_section = Tablets(
+            
+            imei_number = tablet.imei_number,
+            operating_system = tablet.operating_system,
+            version = tablet.version,
+            hard_disk_capacity = tablet.hard_disk_capacity,
+            memory_capacity = tablet.memory_capacity,
+            warranty_start_date = tablet.warranty_start_date,
+            warranty_end_date = tablet.warranty_end_date,
+            return_date = tablet.return_date,
+            devices_id = device_section.devices_id,
+        )
+
+        db.add(tablet_section)
+        db.commit()
+        invalidate_device(tablet.serial_number)
+        db.refresh(tablet_section)
+        return {"message": "Tablet Has Been Added"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post('/add-mouse-keyboard/', response_model=DeviceRequest)
+def add_mouse_keyboard_view(mouse_keyboard: MouseKeyboardRequest, current_user: user_dependency, db: Session=Depends(get_db)):
+    try:
+        device_section = Devices(
+            category = mouse_keyboard.category,
+            brand = mouse_keyboard.brand,
+            model = mouse_keyboard.model,
+            serial_number = mouse_keyboard.serial_number,
+            inventory_number = mouse_keyboard.inventory_number,
+            delivery_date = mouse_keyboard.delivery_date,
+            deployment_date = mouse_keyboard.deployment_date,
+            status_id = mouse_keyboard.status_id,
+            division_id = mouse_keyboard.division_id,
+            added_by = current_user.firstname + " " + current_user.lastname,
+        )
+
+        db.add(device_section)
+        db.flush()
+        record_device_event(db, device_section, "added", current_user.firstname + " " + current_user.lastname)
+        refresh_device_search(db, [device_section.devices_id])
+
+        mouse_keyboard_section = MouseKeyboards(
+            connection_type_id = mouse_keyboard.connection_type_id,
+            devices_id = device_section.devices_id,
+        )
+
+        db.add(mouse_keyboard_section)
+        db.commit()
+        invalidate_device(mouse_keyboard.serial_number)
+        db.refresh(mouse_keyboard_section)
+        return {"message": "Mouse/Keyboard Has Been Added"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post('/add-printer/', response_model=DeviceRequest)
+def add_printer_view(printer: PrinterRequest, current_user: user_dependency, db: Session=Depends(get_db)):
+    try:
+        device_section = Devices(
+            category = printer.category,
+            brand = printer.brand,
+            model = printer.model,
+            serial_number = printer.serial_number,
+            inventory_number = printer.inventory_number,
+            delivery_date = printer.delivery_date,
+            deployment_date = printer.deployment_date,
+            status_id = printer.status_id,
+            division_id = printer.division_id,
+            added_by = current_user.firstname + " " + current_user.lastname,
+        )
+
+        db.add(device_section)
+        db.flush()
+        record_device_event(db, device_section, "added", current_user.firstname + " " + current_user.lastname)
+        refresh_device_search(db, [device_section.devices_id])
+
+        printer_section = Printers(
+            ip_address = printer.ip_address,
+            feature_id = printer.feature_id,
+            connection_type_id = printer.connection_type_id,
+            devices_id = device_section.devices_id,
+        )
+
+        db.add(printer_section)
+        db.commit()
+        invalidate_device(printer.serial_number)
+        db.refresh(printer_section)
+        return {"message": "Printer Has Been Added"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post('/add-crav-equipment/', response_model=DeviceRequest)
+def add_crav_equipment_view(crav_equipment: CRAVEquipmentRequest, current_user: user_dependency, db: Session=Depends(get_db)):
+    try:
+        device_section = Devices(
+            category = crav_equipment.category,
+            brand = crav_equipment.brand,
+            model = crav_equipment.model,
+            serial_number = crav_equipment.serial_number,
+            inventory_number = crav_equipment.inventory_number,
+            delivery_date = crav_equipment.delivery_date,
+            deployment_date = crav_equipment.deployment_date,
+            status_id = crav_equipment.status_id,
+            division_id = crav_equipment.division_id,
+            added_by = current_user.firstname + " " + current_user.lastname,
+        )
+
+        db.add(device_section)
+        db.flush()
+        record_device_event(db, device_section, "added", current_user.firstname + " " + current_user.lastname)
+        refresh_device_search(db, [device_section.devices_id])
+
+        crav_section = CRAVEquipments(
+            name = crav_equipment.name,
+            ip_address = crav_equipment.ip_address,
+            mac_address = crav_equipment.mac_address,
+            devices_id = device_section.devices_id,
+        )
+
+        db.add(crav_section)
+        db.commit()
+        invalidate_device(crav_equipment.serial_number)
+        db.refresh(crav_section)
+        return {"message": "CRAV Has Been Added"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+ 
+# Adds each device's comment count from one grouped subquery rather than a query per row
+def with_comment_count(db, query, comments=Comments.__table__, devices_id=Devices.devices_id):
+    comment_counts = (
+        db.query(comments.c.devices_id, func.count(comments.c.comment_id).label("comment_count"))
+        .group_by(comments.c.devices_id)
+        .subquery()
+    )
+    return (
+        query.add_columns(func.coalesce(comment_counts.c.comment_count, 0).label("comment_count"))
+        .outerjoin(comment_counts, comment_counts.c.devices_id == devices_id)
+    )
+
+# The /get-items/ filters, given the columns of either devices or archived_devices
+def filter_items(query, columns, filter, input, client_id):
+    if filter == "Device Type":
+        query = query.filter(columns.category.ilike(f"%{input}%"))
+
+    if filter == "Status":
+        query = query.filter(SystemStatus.status_description.ilike(f"%{input}%"))
+
+    if filter == "Division":
+        query = query.filter(Divisions.division_name.ilike(f"%{input}%"))
+
+    if filter == "Serial Number":
+        query = query.filter(columns.serial_number.ilike(f"%{input}%"))
+        
+    if filter == "Delivery Date":
+        parsed_date = datetime.strptime(input, "%Y-%m-%d").date()
+        query = query.filter(columns.delivery_date == parsed_date)
+
+    if filter == "Deployment Date":
+        parsed_date = datetime.strptime(input, "%Y-%m-%d").date()
+        query = query.filter(columns.deployment_date == parsed_date)
+
+    if filter == "Client":
+        query = query.filter(
+            or_(
+                Clients.firstname.ilike(f"%{input}%"),
+                Clients.lastname.ilike(f"%{input}%"),
+            )
+        )
+
+    if client_id is not None:
+        query = query.filter(columns.client_id == client_id)
+
+    return query
+
+@router.get('/get-items/')
+def get_items_view(current_user: user_dependency, filter: Optional[str] = None, input: Optional[str] = None, client_id: Optional[int] = None, include_comment_count: bool = False, include_archived: bool = False, fields: Optional[str] = None, db: Session=Depends(get_read_db)):
+    names = parse_fields(fields)
+
+    query = list_joins(db.query(*list_columns(names)).select_from(Devices), names, filter)
+    query = filter_items(query, Devices.__table__.c, filter, input, client_id)
+
+    if include_comment_count:
+        query = with_comment_count(db, query)
+
+    rows = query.all()
+    result_list = []
+
+    for row in rows:
+        item = row_to_item(row, names)
+        if include_comment_count:
+            item["comment_count"] = row.comment_count
+        if include_archived:
+            item["archived"] = False
+        result_list.append(item)
+
+    # Archived devices live in their own tables, so only this flag makes the list read them
+    if include_archived:
+        archived = archived_devices.c
+        query = list_joins(db.query(*list_columns(names, archived), archived.archived_on).select_from(archived_devices), names, filter, archived)
+        query = filter_items(query, archived, filter, input, client_id)
+
+        if include_comment_count:
+            query = with_comment_count(db, query, archived_details[Comments.__table__], archived.devices_id)
+
+        for row in query.all():
+            item = row_to_item(row, names)
+            if include_comment_count:
+                item["comment_count"] = row.comment_count
+            item["archived"] = True
+            item["archived_on"] = row.archived_on
+            result_list.append(item)
+
+
+    return result_list
+
+
+# The /get-unassigned-items/ query, without the comment counts. ix_devices_unassigned covers
+# its devices columns except client_id, so only a fieldset without the client fields is an
+# index-only scan. tests/test_query_plans.py checks the plans.
+def unassigned_items_query(db, names, filter, input):
+    query = list_joins(db.query(*list_columns(names)).select_from(Devices), names, filter)
+
+    query = query.filter(Devices.client_id == None)
+
+    if filter == "Device Type":
+        query = query.filter(Devices.category.ilike(f"%{input}%"))
+
+    if filter == "Status":
+        query = query.filter(SystemStatus.status_description.ilike(f"%{input}%"))
+
+    if filter == "Division":
+        query = query.filter(Divisions.division_name.ilike(f"%{input}%"))
+
+    if filter == "Serial Number":
+        query = query.filter(Devices.serial_number.ilike(f"%{input}%"))
+        
+    if filter == "Delivery Date":
+        parsed_date = datetime.strptime(input, "%Y-%m-%d").date()
+        query = query.filter(Devices.delivery_date == parsed_date)
+
+    if filter == "Deployment Date":
+        parsed_date = datetime.strptime(input, "%Y-%m-%d").date()
+        query = query.filter(Devices.deployment_date == parsed_date)
+
+    if filter == "Client":
+        query = query.filter(
+            or_(
+                Clients.firstname.ilike(f"%{input}%"),
+                Clients.lastname.ilike(f"%{input}%"),
+            )
+        )
+
+    return query
+
+@router.get('/get-unassigned-items/')
+def get_unassigned_items_view(current_user: user_dependency, filter: Optional[str] = None, input: Optional[str] = None, include_comment_count: bool = False, fields: Optional[str] = None, db: Session=Depends(get_read_db)):
+    names = parse_fields(fields)
+    query = unassigned_items_query(db, names, filter, input)
+
+    if include_comment_count:
+        query = with_comment_count(db, query)
+
+    rows = query.all()
+    result_list = []
+
+    for row in rows:
+        item = row_to_item(row, names)
+        if include_comment_count:
+            item["comment_count"] = row.comment_count
+        result_list.append(item)
+
+
+    return result_list
+
+@router.get('/get-assigned-items/')
+def get_assigned_items_view(current_user: user_dependency, filter: Optional[str] = None, input: Optional[str] = None, client_id: Optional[int] = None, include_comment_count: bool = False, fields: Optional[str] = None, db: Session=Depends(get_read_db)):
+    names = parse_fields(fields)
+
+    query = list_joins(db.query(*list_columns(names)).select_from(Devices), names, filter)
+
+    query = query.filter(Devices.client_id != None)
+
+    if filter == "Device Type":
+        query = query.filter(Devices.category.ilike(f"%{input}%"))
+
+    if filter == "Status":
+        query = query.filter(SystemStatus.status_description.ilike(f"%{input}%"))
+
+    if filter == "Division":
+        query = query.filter(Divisions.division_name.ilike(f"%{input}%"))
+
+    if filter == "Serial Number":
+        query = query.filter(Devices.serial_number.ilike(f"%{input}%"))
+        
+    if filter == "Delivery Date":
+        parsed_date = datetime.strptime(input, "%Y-%m-%d").date()
+        query = query.filter(Devices.delivery_date == parsed_date)
+
+    if filter == "Deployment Date":
+        parsed_date = datetime.strptime(input, "%Y-%m-%d").date()
+        query = query.filter(Devices.deployment_date == parsed_date)
+
+    if filter == "Client":
+        query = query.filter(
+            or_(
+                Clients.firstname.ilike(f"%{input}%"),
+                Clients.lastname.ilike(f"%{input}%"),
+                (Clients.firstname + " " + Clients.lastname).ilike(f"%{input}%"),
+            )
+        )
+
+
+    if client_id is not None:
+        query = query.filter(Devices.client_id == client_id)
+
+    if include_comment_count:
+        query = with_comment_count(db, query)
+
+    rows = query.all()
+    result_list = []
+
+    for row in rows:
+        item = row_to_item(row, names)
+        if include_comment_count:
+            item["comment_count"] = row.comment_count
+        result_list.append(item)
+
+
+    return result_list
+
+# Typeahead over serial, inventory number, model, brand, client and division. Reads the
+# device_search table only, best matches first.
+@router.get('/search-devices/')
+def search_devices_view(current_user: user_dependency, q: str, limit: int = 20, db: Session=Depends(get_read_db)):
+    return search_devices(db, q, max(1, min(limit, 100)))
+
+
+# The detail cache is shared by every user, so it is filled from the primary: a lagging
+# replica would cache a row the writer has already changed, past the sticky window. The
+# session only connects on a miss.
+@router.get('/get-item-sn/')
+def get_item_sn_view(serial_number: str, category: str, include_archived: bool = False, db: Session=Depends(get_db)):
+    key = f"item-sn:{category}:{serial_number}" + (":archived" if include_archived else "")
+    return device_detail_cache.get_or_set(key, lambda: load_item_sn(db, serial_number, category, include_archived), tags=device_tags(serial_number))
+
+# The archived device with its status, division and archived detail row, for ?include_archived=true
+def load_archived_item_sn(db, serial_number: str, category: str):
+    archived = archived_devices.c
+    row = (
+        db.query(archived_devices, SystemStatus.status_description, Divisions.division_name)
+        .outerjoin(SystemStatus, archived.status_id == SystemStatus.status_id)
+        .outerjoin(Divisions, archived.division_id == Divisions.division_id)
+        .filter(archived.serial_number == serial_number, archived.category == category)
+        .first()
+    )
+    if row is None:
+        return {"message": "Device not found"}
+
+    item = dict(row._mapping)
+    item["row_version"] = item.pop("version")
+    subtype = {"Laptop": Laptops.__table__, "Tablet": Tablets.__table__}.get(category)
+    if subtype is not None:
+        detail = db.query(archived_details[subtype]).filter(archived_details[subtype].c.devices_id == row.devices_id).first()
+        if detail is not None:
+            detail = dict(detail._mapping)
+            item.update({key: value for key, value in detail.items() if key not in item})
+    item["archived"] = True
+    return item
+
+def load_item_sn(db, serial_number: str, category: str, include_archived: bool = False):
+    item = load_live_item_sn(db, serial_number, category)
+    if include_archived and item == {"message": "Device not found"}:
+        return load_archived_item_sn(db, serial_number, category)
+    return item
+
+def load_live_item_sn(db, serial_number: str, category: str):
+
+
+    if category == "Laptop":
+
+        result = (
+            db.query(
+                Devices,
+                SystemStatus.status_description,
+                Divisions.division_name,
+                Laptops
+            )
+            .outerjoin(SystemStatus, Devices.status_id == SystemStatus.status_id)
+            .outerjoin(Divisions, Devices.division_id == Divisions.division_id)
+            .outerjoin(Laptops, Devices.devices_id == Laptops.devices_id)
+            .filter(Devices.serial_number == serial_number)
+            .first()
+        )
+
+        if result:
+            device, status_description, division_name, laptop = result
+            return {
+                "devices_id": device.devices_id,
+                "category": device.category,
+                "brand": device.brand,
+                "model": device.model,
+                "serial_number": device.serial_number,
+                "inventory_number": device.inventory_number,
+                "delivery_date": device.delivery_date,
+                "deployment_date": device.deployment_date,
+                "status_id": device.status_id,
+                "row_version": device.version,
+                "division_id": device.division_id,
+                "status_description": status_description,
+                "division_name": division_name,
+                "laptop_id": laptop.laptop_id,
+                "cpu_type_id": laptop.cpu_type_id,
+                "hard_disk_capacity": laptop.hard_disk_capacity,
+                "memory_capacity": laptop.memory_capacity,
+                "processor_speed": laptop.processor_speed,
+                "processor_type": laptop.processor_type,
+                "computer_name": laptop.computer_name,
+                "mac_address": laptop.mac_address,
+                "operating_system": laptop.operating_system,
+                "microsoft_office_version": laptop.microsoft_office_version,
+                "antivirus": laptop.antivirus,
+                "pdf_reader": laptop.pdf_reader,
+                "warranty_start_date": laptop.warranty_start_date,
+                "warranty_end_date": laptop.warranty_end_date,
+                "return_date": laptop.return_date,
+                }
+        else:
+            return {"message": "Device not found"}
+
+    elif category == "Tablet":
+        result = (
+            db.query(
+                Devices,
+                SystemStatus.status_description,
+                Divisions.division_name,
+                Tablets
+            )
+            .outerjoin(SystemStatus, Devices.status_id == SystemStatus.status_id)
+            .outerjoin(Divisions, Devices.division_id == Divisions.division_id)
+            .outerjoin(Tablets, Devices.devices_id == Tablets.devices_id)
+            .filter(Devices.serial_number == serial_number)
+            .first()
+        )
+
+        if result:
+            device, status_description, division_name, tablet = result
+            return {
+                "devices_id": device.devices_id,
+                "category": device.category,
+                "brand": device.brand,
+                "model": device.model,
+                "serial_number": device.serial_number,
+                "inventory_number": device.inventory_number,
+                "delivery_date": device.delivery_date,
+                "deployment_date": device.deployment_date,
+                "status_id": device.status_id,
+                "row_version": device.version,
+                "division_id": device.division_id,
+                "status_description": status_description,
+                "division_name": division_name,
+                "tablet_id": tablet.tablet_id,
+                "imei_number": tablet.imei_number,
+                "operating_system": tablet.operating_system,
+                "version": tablet.version,
+                "hard_disk_capacity": tablet.hard_disk_capacity,
+                "memory_capacity": tablet.memory_capacity,
+                "warranty_start_date": tablet.warranty_start_date,
+                "warranty_end_date": tablet.warranty_end_date,
+                "return_date": tablet.return_date,
+                }
+        else:
+            return {"message": "Device not found"}
+
+    elif (category == "Mouse") or (category == "Keyboard"):
+        result = (
+            db.query(
+                Devices,
+                SystemStatus.status_description,
+                Divisions.division_name,
+                MouseKeyboards
+            )
+            .outerjoin(SystemStatus, Devices.status_id == SystemStatus.status_id)
+            .outerjoin(Divisions, Devices.division_id == Divisions.division_id)
+            .outerjoin(MouseKeyboards, Devices.devices_id == MouseKeyboards.devices_id)
+            .filter(Devices.serial_number == serial_number)
+            .first()
+        )
+
+        if result:
+            device, status_description, division_name, mouse_keyboard = result
+            return {
+                "devices_id": device.devices_id,
+                "category": device.category,
+                "brand": device.brand,
+                "model": device.model,
+                "serial_number": device.serial_number,
+                "inventory_number": device.inventory_number,
+                "delivery_date": device.delivery_date,
+                "deployment_date": device.deployment_date,
+                "status_id": device.status_id,
+                "row_version": device.version,
+                "division_id": device.division_id,
+                "status_description": status_description,
+                "division_name": division_name,
+                "mouse_keyboard_id": mouse_keyboard.mouse_keyboard_id,
+                "connection_type_id": mouse_keyboard.connection_type_id,
+                }
+        else:
+            return {"message": "Device not found"}
+        
+    elif category == "Printer":
+        result = (
+            db.query(
+                Devices,
+                SystemStatus.status_description,
+                Divisions.division_name,
+                Printers
+            )
+            .outerjoin(SystemStatus, Devices.status_id == SystemStatus.status_id)
+            .outerjoin(Divisions, Devices.division_id == Divisions.division_id)
+            .outerjoin(Printers, Devices.devices_id == Printers.devices_id)
+            .filter(Devices.serial_number == serial_number)
+            .first()
+        )
+
+        if result:
+            device, status_description, division_name, printer = result
+            return {
+                "devices_id": device.devices_id,
+                "category": device.category,
+                "brand": device.brand,
+                "model": device.model,
+                "serial_number": device.serial_number,
+                "inventory_number": device.inventory_number,
+                "delivery_date": device.delivery_date,
+                "deployment_date": device.deployment_date,
+                "status_id": device.status_id,
+                "row_version": device.version,
+                "division_id": device.division_id,
+                "status_description": status_description,
+                "division_name": division_name,
+                "printer_id": printer.printer_id,
+                "ip_address": printer.ip_address,
+                "feature_id": printer.feature_id,
+                "connection_type_id": printer.connection_type_id,
+                }
+        else:
+            return {"message": "Device not found"}
+        
+    elif category == "CRAV":
+        result = (
+            db.query(
+                Devices,
+                SystemStatus.status_description,
+                Divisions.division_name,
+                CRAVEquipments
+            )
+            .outerjoin(SystemStatus, Devices.status_id == SystemStatus.status_id)
+            .outerjoin(Divisions, Devices.division_id == Divisions.division_id)
+            .outerjoin(CRAVEquipments, Devices.devices_id == CRAVEquipments.devices_id)
+            .filter(Devices.serial_number == serial_number)
+            .first()
+        )
+
+        if result:
+            device, status_description, division_name, crav = result
+            return {
+                "devices_id": device.devices_id,
+                "category": device.category,
+                "brand": device.brand,
+                "model": device.model,
+                "serial_number": device.serial_number,
+                "inventory_number": device.inventory_number,
+                "delivery_date": device.delivery_date,
+                "deployment_date": device.deployment_date,
+                "status_id": device.status_id,
+                "row_version": device.version,
+                "division_id": device.division_id,
+                "status_description": status_description,
+                "division_name": division_name,
+                "cr_equipment_id": crav.cr_equipment_id,
+                "name": crav.name,
+                "ip_address": crav.ip_address,
+                "mac_address": crav.mac_address,
+                }
+        else:
+            return {"message": "Device not found"}
+        
+    else:
+        result = (
+            db.query(
+                Devices,
+                SystemStatus.status_description,
+                Divisions.division_name,
+            )
+            .outerjoin(SystemStatus, Devices.status_id == SystemStatus.status_id)
+            .outerjoin(Divisions, Devices.division_id == Divisions.division_id)
+            .filter(Devices.serial_number == serial_number)
+            .first()
+        )
+
+        if result:
+            device, status_description, division_name = result
+            return {
+                "devices_id": device.devices_id,
+                "category": device.category,
+                "brand": device.brand,
+                "model": device.model,
+                "serial_number": device.serial_number,
+                "inventory_number": device.inventory_number,
+                "delivery_date": device.delivery_date,
+                "deployment_date": device.deployment_date,
+                "status_id": device.status_id,
+                "row_version": device.version,
+                "division_id": device.division_id,
+                "status_description": status_description,
+                "division_name": division_name,
+                }
+        else:
+            return {"message": "Device not found"}
+
+
+    return {"message": "Category not supported"}
+
+# Optimistic concurrency: clients may send the row_version they last read, and a write that
+# races another one fails its versioned UPDATE. Either way the caller gets a 409.
+# Devices.version is called row_version in the API so it never clashes with a tablet's OS version.
+def version_conflict():
+    return HTTPException(status_code=409, detail="Device was changed by someone else, reload it and try again")
+
+def check_version(device, row_version):
+    if row_version is not None and device.version != row_version:
+        raise version_conflict()
+
+
+@router.delete('/delete-item/')
+def delete_item_view(current_user: user_dependency, serial_number: str, row_version: Optional[int] = None, db: Session=Depends(get_db)):
+    deleted = db.query(Devices).filter(Devices.serial_number == serial_number).first()
+
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Device not found")
+    check_version(deleted, row_version)
+
+    try:
+        record_device_event(db, deleted, "deleted", current_user.firstname + " " + current_user.lastname)
+        remove_device_search(db, deleted.devices_id)
+        db.delete(deleted)
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise version_conflict()
+    invalidate_device(serial_number)
+    
+    return {"message": "Device has been deleted"}
+
+@router.post('/unassign-item/')
+def unassign_item_view(current_user: user_dependency, serial_number: str, row_version: Optional[int] = None, db: Session=Depends(get_db)):
+    device = db.query(Devices).filter(Devices.serial_number == serial_number).first()
+
+    if not device:
+        raise HTTPException(status_code=404, detail="Device not found")
+    check_version(device, row_version)
+
+    try:
+        device.client_id = None
+        record_device_event(db, device, "unassigned", current_user.firstname + " " + current_user.lastname)
+        refresh_device_search(db, [device.devices_id])
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise version_conflict()
+    invalidate_device(serial_number)
+
+    return {"message": "Device has been unassigned from the client", "row_version": device.version}
+
+
+@router.put('/assign-device/')
+def assign_device_view(current_user: user_dependency, device_sn: str, client_id: int, row_version: Optional[int] = None, db: Session=Depends(get_db)):
+    device = db.query(Devices).filter(Devices.serial_number == device_sn).first()
+
+    if device:
+        check_version(device, row_version)
+        try:
+            device.client_id = client_id
+            device.assigned_on = date.today()
+            record_device_event(db, device, "assigned", current_user.firstname + " " + current_user.lastname)
+            refresh_device_search(db, [device.devices_id])
+            db.commit()
+        except StaleDataError:
+            db.rollback()
+            raise version_conflict()
+        invalidate_device(device_sn)
+        db.refresh(device)
+        return {"message": "Device assigned successfully", "item_id": device.devices_id, "client": client_id, "row_version": device.version}
+    
+    else:
+        raise HTTPException(
+            status_code=404,
+            detail="Device not found"
+        )
+
+
+@router.get('/get-item-sn/stats/')
+def get_item_sn_stats_view(current_user: user_dependency):
+    return device_detail_cache.stats()
+
+
+@router.get('/get-comments/')
+def get_comments_view(current_user: user_dependency, devices_id: int, response: Response, limit: Optional[int] = None, before: Optional[int] = None, db: Session=Depends(get_read_db)):
+    query = db.query(Comments).filter(Comments.devices_id == devices_id)
+
+    # Newest first; pass the X-Next-Cursor value back as ?before= for the next page
+    if before is not None:
+        query = query.filter(Comments.comment_id < before)
+
+    query = query.order_by(desc(Comments.comment_id))
+
+    if limit is None:
+        return query.all()
+
+    limit = max(1, min(limit, 500))
+    comments = query.limit(limit + 1).all()
+    if len(comments) > limit:
+        comments = comments[:limit]
+        response.headers["X-Next-Cursor"] = str(comments[-1].comment_id)
+    return comments
+
+@router.post('/add-comments/')
+def add_comments_view(comment: CommentCreate, current_user: user_dependency, db: Session=Depends(get_db)):
+    try:
+        device = db.query(Devices).filter(Devices.devices_id == comment.id).first()
+        
+        if device:
+            new_comment = Comments(
+                devices_id = comment.id,
+                comment_value = comment.comment,
+            )
+
+            db.add(new_comment)
+            db.commit()
+            invalidate_device(device.serial_number)
+            db.refresh(new_comment)
+            return {"message": "Comment Has Been Added"}
+        else:
+            return {"message": "Comment Not Found"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+@router.delete('/delete-comment/')
+def delete_comments_view(current_user: user_dependency, id: int, db: Session=Depends(get_db)):
+    device = db.query(Devices.serial_number).join(Comments, Comments.devices_id == Devices.devices_id).filter(Comments.comment_id == id).first()
+    deleted = db.query(Comments).filter(Comments.comment_id == id).delete()
+    db.commit()
+    if device:
+        invalidate_device(device.serial_number)
+
+    if deleted == 0:
+        raise HTTPException(status_code=404, detail="Device not found")
+    
+    return {"message": "comment has been deleted"}
+
+
+@router.post("/update-status/", status_code=status.HTTP_201_CREATED)
+# A plain def so FastAPI runs it in the threadpool; as a coroutine its blocking queries and
+# lock waits stalled the event loop for every other request in the worker
+def update_status(status_box: UpdateStatusRequest, current_user: user_dependency, db: Session=Depends(get_db)):
+    existing_statuses = db.query(SystemStatus.status_id).all()
+    existing_statuses = [row[0] for row in existing_statuses]
+    device = db.query(Devices).filter(Devices.serial_number == status_box.serial_number).first()
+
+    if not device:
+        raise HTTPException(status_code=404, detail="Device not found")
+    
+    elif status_box.new_status not in existing_statuses:
+        raise HTTPException(status_code=404, detail="Status not found")
+    
+    # Checked before the status itself, which a stale client would otherwise see as "already has this status"
+    check_version(device, status_box.row_version)
+
+    if device.status_id == status_box.new_status:
+        raise HTTPException(status_code=404, detail="Device already has this status")
+    
+    else:
+        try:
+            if device.status_id == 2 and status_box.new_status == 1:
+                device.repaired_date = date.today()
+                device.repaired_by = current_user.firstname + " " + current_user.lastname
+
+            if status_box.new_status == 2:
+                device.repair_started_on = date.today()
+
+            device.status_id = status_box.new_status
+            record_device_event(db, device, "status_updated", current_user.firstname + " " + current_user.lastname)
+            refresh_device_search(db, [device.devices_id])
+
+            db.commit()
+        except StaleDataError:
+            db.rollback()
+            raise version_conflict()
+        invalidate_device(status_box.serial_number)
+        db.refresh(device)
+        return device_out(device)
+
+
+@router.get('/changes/')
+def get_changes_view(current_user: user_dependency, since: int = 0, limit: int = 500, db: Session=Depends(get_read_db)):
+    limit = max(1, min(limit, 5000))
+    events = db.query(DeviceEvents).filter(DeviceEvents.seq > since).order_by(DeviceEvents.seq).limit(limit + 1).all()
+
+    has_more = len(events) > limit
+    events = events[:limit]
+
+    return {
+        "events": [event_to_dict(event) for event in events],
+        "last_seq": events[-1].seq if events else since,
+        "has_more": has_more,
+    }
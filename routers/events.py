@@ -0,0 +1,87 @@
+import json
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from models import DeviceEvents
+from dependencies import get_read_db, get_user, token_subject
+from device_events import event_to_dict
+from pubsub import hub, tail_device_events, PUSH_BROKER
+
+router = APIRouter(tags=["events"])
+
+KEEPALIVE_SECONDS = 15
+
+_tail_task = None
+
+async def startup():
+    global _tail_task
+    hub.bind(asyncio.get_running_loop())
+    if PUSH_BROKER == "db":
+        _tail_task = asyncio.create_task(tail_device_events())
+
+async def shutdown():
+    if _tail_task is not None:
+        _tail_task.cancel()
+
+
+def _format_event(event):
+    return f"id: {event['seq']}\nevent: device\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+# EventSource cannot send an Authorization header, so the token may also come as ?token=
+@router.get('/device-events/stream')
+async def device_events_stream(
+    request: Request,
+    token: Optional[str] = None,
+    since: Optional[int] = None,
+    authorization: Optional[str] = Header(None),
+    last_event_id: Optional[str] = Header(None),
+    db: Session=Depends(get_read_db),
+):
+    if authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    email = token_subject(token)
+    if email is None or get_user(db, email) is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    # Subscribe before reading the backlog so nothing committed in between is missed
+    queue = hub.subscribe()
+    backlog = []
+    if since is not None:
+        backlog = [event_to_dict(item) for item in db.query(DeviceEvents).filter(DeviceEvents.seq > since).order_by(DeviceEvents.seq).limit(5000).all()]
+    db.close()
+
+    async def stream():
+        last_seq = since or 0
+        try:
+            for event in backlog:
+                last_seq = event["seq"]
+                yield _format_event(event)
+
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if event is None:
+                    yield f"event: resync\ndata: {json.dumps({'since': last_seq})}\n\n"
+                    return
+                if event["seq"] <= last_seq:
+                    continue
+                last_seq = event["seq"]
+                yield _format_event(event)
+        finally:
+            hub.unsubscribe(queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
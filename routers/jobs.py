@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+from models import Jobs, JobRequest
+from dependencies import get_db, user_dependency
+from jobs import job_runner, JOB_KINDS, FINISHED
+
+router = APIRouter(tags=["jobs"])
+
+
+async def startup():
+    await job_runner.start()
+
+async def shutdown():
+    await job_runner.stop()
+
+
+@router.post('/jobs/', status_code=status.HTTP_202_ACCEPTED)
+def submit_job_view(job_request: JobRequest, current_user: user_dependency, db: Session=Depends(get_db)):
+    if job_request.kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind. Available: {', '.join(JOB_KINDS)}")
+
+    job = job_runner.submit(db, job_request.kind, job_request.params, current_user.firstname + " " + current_user.lastname)
+    return {"job_id": job.job_id, "status": job.status}
+
+@router.get('/jobs/{job_id}')
+def get_job_view(job_id: str, current_user: user_dependency, db: Session=Depends(get_db)):
+    job = db.query(Jobs).filter(Jobs.job_id == job_id).first()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "job_id": job.job_id,
+        "kind": job.kind,
+        "status": job.status,
+        "error": job.error,
+        "created_by": job.created_by,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "attempts": job.attempts,
+    }
+
+@router.get('/jobs/{job_id}/result')
+def get_job_result_view(job_id: str, current_user: user_dependency, db: Session=Depends(get_db)):
+    job = db.query(Jobs).filter(Jobs.job_id == job_id).first()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job.status != FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+
+    headers = {}
+    if job.result_media_type == "text/csv":
+        headers["Content-Disposition"] = f'attachment; filename="{job.kind}-{job.job_id}.csv"'
+    return Response(content=job.result, media_type=job.result_media_type, headers=headers)
@@ -0,0 +1,261 @@
+import json
+import hashlib
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from models import *
+from dependencies import get_db, user_dependency
+from cache import cache, row_to_dict
+from invalidation import invalidation_bus
+from singleflight import single_flight
+from limits import route_limiters
+from search import refresh_device_search
+
+router = APIRouter(tags=["reference data"])
+
+
+# Reference tables are tiny and read on every page load, so they are served from the
+# cache and each write endpoint invalidates its table's tag. Misses are loaded from the
+# primary (get_db), never a replica, so replica lag cannot outlive the invalidation.
+def cached_rows(db, model, tag):
+    return cache.get_or_set(tag, lambda: [row_to_dict(row) for row in db.query(model).all()], tags=(tag,))
+
+
+# Everything the frontend loads on login, as payload key -> (model, cache tag)
+BOOTSTRAP_TABLES = {
+    "statuses": (SystemStatus, "statuses"),
+    "cpu_types": (CPUTypes, "cpu-types"),
+    "connection_types": (ConnectionTypes, "connection-types"),
+    "printer_features": (PrinterFeatures, "printer-features"),
+    "divisions": (Divisions, "divisions"),
+    "locations": (Locations, "locations"),
+    "parishes": (Parishes, "parishes"),
+}
+
+# The version is a hash of the content rather than of the cache tag versions, so every
+# worker gives the same version for the same data. The body is cached already encoded.
+def load_bootstrap(db):
+    data = jsonable_encoder({key: cached_rows(db, model, tag) for key, (model, tag) in BOOTSTRAP_TABLES.items()})
+    version = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:16]
+    return {"version": version, "body": json.dumps({"version": version, **data}).encode()}
+
+
+@router.get('/cache/stats/')
+def get_cache_stats_view(current_user: user_dependency):
+    return {"cache": cache.stats(), "invalidation": invalidation_bus.stats(), "coalescing": single_flight.stats(),
+            "limits": {name: limiter.stats() for name, limiter in route_limiters.items()}}
+
+# One request instead of the seven reference lists. A client that sends back the version it
+# has (?version= or If-None-Match) gets an empty 304 when nothing changed.
+@router.get('/bootstrap/')
+def get_bootstrap_view(current_user: user_dependency, request: Request, version: Optional[str] = None, db: Session=Depends(get_db)):
+    snapshot = cache.get_or_set("bootstrap", lambda: load_bootstrap(db), tags=[tag for _, tag in BOOTSTRAP_TABLES.values()])
+    etag = f'"{snapshot["version"]}"'
+
+    # CompressionMiddleware turns the ETag into a weak one, which clients then send back
+    if version == snapshot["version"] or request.headers.get("if-none-match") in (etag, "W/" + etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    return Response(content=snapshot["body"], media_type="application/json", headers={"ETag": etag})
+
+@router.get('/get-statuses/')
+def get_statuses_view(current_user: user_dependency, db: Session=Depends(get_db)):
+    return cached_rows(db, SystemStatus, "statuses")
+
+@router.get('/get-cpu-types/')
+def get_cpu_types_view(current_user: user_dependency, db: Session=Depends(get_db)):
+    return cached_rows(db, CPUTypes, "cpu-types")
+
+@router.get('/get-connection-types/')
+def get_connection_types_view(current_user: user_dependency, db: Session=Depends(get_db)):
+    return cached_rows(db, ConnectionTypes, "connection-types")
+
+@router.get('/get-printer-features/')
+def get_printer_features_view(current_user: user_dependency, db: Session=Depends(get_db)):
+    return cached_rows(db, PrinterFeatures, "printer-features")
+
+@router.get('/get-divisions/')
+def get_divisions_view(current_user: user_dependency, db: Session=Depends(get_db)):
+    return cached_rows(db, Divisions, "divisions")
+
+
+@router.post('/add-status/')
+def add_status_view(status: StatusCreate, current_user: user_dependency, db: Session=Depends(get_db)):
+    try:
+        new_status = SystemStatus(
+            status_description = status.status,
+        )
+
+        db.add(new_status)
+        db.commit()
+        cache.invalidate("statuses")
+        db.refresh(new_status)
+        return {"message": "Status Has Been Added"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+@router.post('/add-division/')
+def add_division_view(division: DivisionCreate, current_user: user_dependency, db: Session=Depends(get_db)):
+    try:
+        new_division = Divisions(
+            division_name = division.division,
+            added_by = current_user.firstname + " " + current_user.lastname,
+        )
+
+        db.add(new_division)
+        db.commit()
+        cache.invalidate("divisions")
+        db.refresh(new_division)
+        return {"message": "Division Has Been Added"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/delete-status/")
+def delete_status_view(
+    current_user: user_dependency,
+    status: str,
+    db: Session = Depends(get_db)
+):
+
+    status_record = db.query(SystemStatus).filter(SystemStatus.status_description == status).first()
+
+    if not status_record:
+        raise HTTPException(status_code=404, detail="Status not found")
+
+    # Lock the affected rows first so a concurrent single-device write waits instead of racing the bulk update
+    affected = [row[0] for row in db.query(Devices.devices_id).filter(Devices.status_id == status_record.status_id).order_by(Devices.devices_id).with_for_update()]
+
+    # Set status to NULL for all devices using this status
+    db.query(Devices).filter(Devices.devices_id.in_(affected)).update({Devices.status_id: None, Devices.version: Devices.version + 1}, synchronize_session=False)
+
+    db.delete(status_record)
+    refresh_device_search(db, affected)
+    db.commit()
+    cache.invalidate("statuses", "devices")
+
+    return {"message": "Status deleted and devices updated"}
+
+@router.delete("/delete-division/")
+def delete_division_view(
+    current_user: user_dependency,
+    division: str,
+    db: Session = Depends(get_db)
+):
+
+    division_record = db.query(Divisions).filter(Divisions.division_name == division).first()
+
+    if not division_record:
+        raise HTTPException(status_code=404, detail="Division not found")
+
+    affected = [row[0] for row in db.query(Devices.devices_id).filter(Devices.division_id == division_record.division_id).order_by(Devices.devices_id).with_for_update()]
+
+    # Set status to NULL for all devices using this status
+    db.query(Devices).filter(Devices.devices_id.in_(affected)).update({Devices.status_id: None, Devices.version: Devices.version + 1}, synchronize_session=False)
+
+    db.delete(division_record)
+    refresh_device_search(db, affected)
+    db.commit()
+    cache.invalidate("divisions", "devices")
+
+    return {"message": "Division deleted and devices updated"}
+    
+
+
+@router.post('/add-cpu-type/')
+def add_cpu_type_view(cpu_type: CPUTypeCreate, current_user: user_dependency, db: Session=Depends(get_db)):
+    try:
+        new_cpu_type = CPUTypes(
+            cpu_type_description = cpu_type.cpu_type,
+        )
+
+        db.add(new_cpu_type)
+        db.commit()
+        cache.invalidate("cpu-types")
+        db.refresh(new_cpu_type)
+        return {"message": "CPU Type Has Been Added"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+
+@router.delete('/delete-cpu-type/')
+def delete_cpu_type_view(cpu_type: str, current_user: user_dependency, db: Session=Depends(get_db)):
+    deleted = db.query(CPUTypes).filter(CPUTypes.cpu_type_description == cpu_type).delete()
+    db.commit()
+    cache.invalidate("cpu-types")
+
+    if deleted == 0:
+        raise HTTPException(status_code=404, detail="CPU Type not found")
+    
+    return {"message": "Cpu Type has been deleted"}
+
+
+@router.post('/add-connection-type/')
+def add_connection_type_view(ctype: ConnectionTypeCreate, current_user: user_dependency, db: Session=Depends(get_db)):
+    try:
+        new_ctype = ConnectionTypes(
+            ctype_description = ctype.ctype,
+        )
+
+        db.add(new_ctype)
+        db.commit()
+        cache.invalidate("connection-types")
+        db.refresh(new_ctype)
+        return {"message": "Connection Type Has Been Added"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+@router.delete('/delete-connection-type/')
+def delete_connection_type_view(current_user: user_dependency, ctype: str, db: Session=Depends(get_db)):
+    deleted = db.query(ConnectionTypes).filter(ConnectionTypes.ctype_description == ctype).delete()
+    db.commit()
+    cache.invalidate("connection-types")
+
+    if deleted == 0:
+        raise HTTPException(status_code=404, detail="Connection Type not found")
+    
+    return {"message": "Connection Type has been deleted"}
+
+
+@router.post('/add-printer-feature/')
+def add_printer_feature_view(printer_feature: PrinterFeatureCreate, current_user: user_dependency, db: Session=Depends(get_db)):
+    try:
+        new_printer_feature = PrinterFeatures(
+            feature_description = printer_feature.printer_feature,
+        )
+
+        db.add(new_printer_feature)
+        db.commit()
+        cache.invalidate("printer-features")
+        db.refresh(new_printer_feature)
+        return {"message": "Printer Feature Has Been Added"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+
+@router.delete('/delete-printer-feature/')
+def delete_printer_feature_view(current_user: user_dependency, printer_feature: str, db: Session=Depends(get_db)):
+    deleted = db.query(PrinterFeatures).filter(PrinterFeatures.feature_description == printer_feature).delete()
+    db.commit()
+    cache.invalidate("printer-features")
+
+    if deleted == 0:
+        raise HTTPException(status_code=404, detail="Printer Feature not found")
+    
+    return {"message": "Printer Feature has been deleted"}
+
+
+@router.get('/get-location-names/')
+def get_location_names_view(current_user: user_dependency, db: Session=Depends(get_db)):
+    return cached_rows(db, Locations, "locations")
+
+
+@router.get('/get-parish-names/')
+def get_parish_names_view(current_user: user_dependency, db: Session=Depends(get_db)):
+    return cached_rows(db, Parishes, "parishes")
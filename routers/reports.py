@@ -0,0 +1,467 @@
+import json
+import asyncio
+from datetime import date, timedelta
+from typing import Any, List, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import func, case, and_, select, union_all
+from sqlalchemy.orm import Session
+from models import Devices, Divisions, Locations, Parishes, SystemStatus, Clients, Laptops, Tablets, FilterRequest
+from dependencies import get_read_db, user_dependency
+from replicas import replica_router
+from analytics import analytics_enabled, current_snapshot, device_snapshot, refresh_snapshot_forever
+from hierarchy import hierarchy_tree
+from fieldsets import parse_fields, list_columns, row_to_item, COLUMN_FIELDS
+from singleflight import coalesced
+from limits import LimitedStreamingResponse
+
+router = APIRouter(tags=["reports"])
+
+_refresh_task = None
+
+
+async def startup():
+    global _refresh_task
+    if analytics_enabled():
+        _refresh_task = asyncio.create_task(refresh_snapshot_forever())
+
+async def shutdown():
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        await asyncio.gather(_refresh_task, return_exceptions=True)
+
+
+@router.get("/analytics/stats/")
+def get_analytics_stats_view(current_user: user_dependency):
+    return device_snapshot.stats()
+
+
+@router.get("/hierarchy/")
+def get_hierarchy(current_user: user_dependency, by_category: bool = False, by_status: bool = False) -> Dict[str, Any]:
+    """
+    Returns the parish -> location -> division tree with the device count of every node,
+    optionally broken down by category and by status.
+    """
+    return hierarchy_tree.tree(by_category, by_status)
+
+
+@router.get("/get-all-locations/")
+@coalesced
+def get_all_locations(db: Session = Depends(get_read_db)) -> List[Dict[str, Any]]:
+    """
+    Returns a list of all locations, 
+    each with the count of devices per category under that location.
+    """
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        return snapshot.location_category_counts()
+
+    try:
+        # Step 1: Get all locations
+        locations = db.query(Locations).all()
+
+        results = []
+
+        # Step 2: For each location, count devices by category
+        for loc in locations:
+            category_counts = (
+                db.query(Devices.category, func.count(Devices.devices_id))
+                .join(Divisions, Devices.division_id == Divisions.division_id)
+                .filter(Divisions.location_id == loc.location_id)
+                .group_by(Devices.category)
+                .all()
+            )
+
+            # Step 3: Format data
+            formatted_counts = [
+                {"category": category, "count": count} for category, count in category_counts
+            ]
+
+            results.append({
+                "location_name": loc.location_name,
+                "category_counts": formatted_counts
+            })
+
+        return results
+
+    except Exception as e:
+        print(f"Error fetching location data: {e}")
+        raise HTTPException(status_code=500, detail="Error retrieving location data.")
+
+
+@router.get("/filter-delivery-date/")
+@coalesced
+def filter_delivery_date(date: date, current_user: user_dependency, db: Session = Depends(get_read_db)):
+    snapshot = current_snapshot(current_user.email)
+    if snapshot is not None:
+        return snapshot.filter_date("delivery_date", date)
+
+    query = (
+        db.query(
+            Devices.devices_id,
+            Devices.category,
+            Devices.brand,
+            Devices.model,
+            Devices.serial_number,
+            Devices.inventory_number,
+            Devices.delivery_date,
+            Divisions.division_name,
+            SystemStatus.status_description,
+        )
+        .join(Divisions, Devices.division_id == Divisions.division_id)
+        .join(SystemStatus, Devices.status_id == SystemStatus.status_id)
+    )
+
+    if date:
+        query = query.filter(Devices.delivery_date >= date)
+
+        results = query.all()
+
+    return [
+        {
+            "devices_id": r.devices_id,
+            "category": r.category,
+            "brand": r.brand,
+            "model": r.model,
+            "serial_number": r.serial_number,
+            "inventory_number": r.inventory_number,
+            "delivery_date": r.delivery_date,
+            "status_description": r.status_description,
+            "division_name": r.division_name,
+        }
+        for r in results
+    ]
+
+
+@router.get("/filter-deployment-date/")
+@coalesced
+def filter_deployment_date(date: date, current_user: user_dependency, db: Session = Depends(get_read_db)):
+    snapshot = current_snapshot(current_user.email)
+    if snapshot is not None:
+        return snapshot.filter_date("deployment_date", date)
+
+    query = (
+        db.query(
+            Devices.devices_id,
+            Devices.category,
+            Devices.brand,
+            Devices.model,
+            Devices.serial_number,
+            Devices.inventory_number,
+            Devices.deployment_date,
+            Divisions.division_name,
+            SystemStatus.status_description,
+        )
+        .join(Divisions, Devices.division_id == Divisions.division_id)
+        .join(SystemStatus, Devices.status_id == SystemStatus.status_id)
+    )
+
+    if date:
+        query = query.filter(Devices.deployment_date >= date)
+
+        results = query.all()
+
+    return [
+        {
+            "devices_id": r.devices_id,
+            "category": r.category,
+            "brand": r.brand,
+            "model": r.model,
+            "serial_number": r.serial_number,
+            "inventory_number": r.inventory_number,
+            "deployment_date": r.deployment_date,
+            "status_description": r.status_description,
+            "division_name": r.division_name,
+        }
+        for r in results
+    ]
+
+
+@router.post("/filter-devices/")
+@coalesced
+def filter_devices(
+    filters: FilterRequest,
+    current_user: user_dependency,
+    db: Session = Depends(get_read_db)
+):
+    snapshot = current_snapshot(current_user.email)
+    if snapshot is not None:
+        return snapshot.filter_devices(filters)
+
+    query = (
+        db.query(
+            Devices.devices_id,
+            Devices.category,
+            Devices.brand,
+            Devices.model,
+            Devices.serial_number,
+            Devices.inventory_number,
+            Devices.delivery_date,
+            SystemStatus.status_description,
+            Locations.location_name,
+        )
+        .join(SystemStatus, Devices.status_id == SystemStatus.status_id, isouter=True)
+        .join(Divisions, Devices.division_id == Divisions.division_id, isouter=True)
+        .join(Locations, Divisions.location_id == Locations.location_id, isouter=True)
+        .join(Parishes, Locations.parish_id == Parishes.parish_id, isouter=True)
+        
+    )
+
+    # ✅ Step 3: Apply filters dynamically
+    if filters.locations:
+        query = query.filter(Locations.location_name.in_(filters.locations))
+
+    if filters.parishes:
+        query = query.filter(Parishes.parish_name.in_(filters.parishes))
+
+    if filters.statuses:
+        query = query.filter(SystemStatus.status_description.in_(filters.statuses))
+
+    if filters.components:
+        query = query.filter(Devices.category.in_(filters.components))
+
+    results = query.all()
+
+    return [
+        {
+            "devices_id": r.devices_id,
+            "category": r.category,
+            "brand": r.brand,
+            "model": r.model,
+            "serial_number": r.serial_number,
+            "inventory_number": r.inventory_number,
+            "delivery_date": r.delivery_date,
+            "status_description": r.status_description,
+            "location_name": r.location_name,
+        }
+        for r in results
+    ]
+
+DEVICE_COLUMNS = [COLUMN_FIELDS.get(column.name, column.name) for column in Devices.__table__.columns]
+
+@router.get('/get-items-delivery-date/')
+def get_items_delivery_date_view(delivery_date: date, current_user: user_dependency, fields: Optional[str] = None, db: Session=Depends(get_read_db)):
+    names = parse_fields(fields, DEVICE_COLUMNS)
+    rows = db.query(*list_columns(names)).filter(Devices.delivery_date > delivery_date).all()
+    return [row_to_item(row, names) for row in rows]
+
+# The /filter-being-repaired/ query, answered from ix_devices_in_repair
+def being_repaired_query(db):
+    query = (
+        db.query(
+            Devices.devices_id,
+            Devices.category,
+            Devices.brand,
+            Devices.model,
+            Devices.serial_number,
+            Devices.inventory_number,
+            Devices.delivery_date,
+            Divisions.division_name,
+            SystemStatus.status_description,
+            Clients.firstname,
+            Clients.lastname,
+        )
+        .outerjoin(Divisions, Devices.division_id == Divisions.division_id)
+        .outerjoin(SystemStatus, Devices.status_id == SystemStatus.status_id)
+        .outerjoin(Clients, Devices.client_id == Clients.client_id)
+    )
+
+    return query.filter(Devices.status_id == 2)
+
+@router.get('/filter-being-repaired/')
+@coalesced
+def filter_being_repaired(current_user: user_dependency, db: Session=Depends(get_read_db)):
+    snapshot = current_snapshot(current_user.email)
+    if snapshot is not None:
+        return snapshot.filter_status(2)
+
+    results = being_repaired_query(db).all()
+
+    return [
+        {
+            "devices_id": r.devices_id,
+            "category": r.category,
+            "brand": r.brand,
+            "model": r.model,
+            "serial_number": r.serial_number,
+            "inventory_number": r.inventory_number,
+            "delivery_date": r.delivery_date,
+            "status_description": r.status_description,
+            "division_name": r.division_name,
+            "client_first_name": r.firstname,
+            "client_last_name": r.lastname,
+        }
+        for r in results
+    ]
+
+
+# THIS IS THE SECTION THAT DEFINES THE LIFECYCLE REPORTS ####################################################
+# Each report is one aggregated query. The row-per-device reports are streamed as a JSON
+# array from their own session, since the request's session is closed before the body is sent.
+
+AGE_BUCKETS = [(1, "under_1_year"), (3, "1_to_3_years"), (5, "3_to_5_years")]
+GROUP_COLUMNS = {
+    "division": (Divisions.division_id, Divisions.division_name),
+    "location": (Locations.location_id, Locations.location_name),
+    "category": (Devices.category, Devices.category),
+}
+
+def years_ago(today, years):
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        return today.replace(year=today.year - years, day=28)
+
+def days_between(db, start, end):
+    if db.get_bind().dialect.name == "sqlite":
+        return func.julianday(end) - func.julianday(start)
+    return end - start
+
+# The stream reads with its own session after the endpoint has returned, so it carries the
+# route class's statement timeout itself and keeps the route slot until it is done
+def stream_json(request, user_key, build, batch_size=500):
+    statement_timeout = getattr(request.state, "statement_timeout", None)
+
+    def rows():
+        db = replica_router.read_session(user_key)
+        db.info["statement_timeout"] = statement_timeout
+        try:
+            yield "["
+            chunk = []
+            first = True
+            for row in db.execute(build(db).execution_options(yield_per=batch_size)).mappings():
+                chunk.append(json.dumps(dict(row), default=str))
+                if len(chunk) == batch_size:
+                    yield ("" if first else ",") + ",".join(chunk)
+                    first = False
+                    chunk = []
+            if chunk:
+                yield ("" if first else ",") + ",".join(chunk)
+            yield "]"
+        finally:
+            db.close()
+    return LimitedStreamingResponse(request, rows(), media_type="application/json")
+
+
+@router.get("/warranties-expiring/")
+def warranties_expiring(current_user: user_dependency, request: Request, days: int = 30, include_expired: bool = False):
+    today = date.today()
+    until = today + timedelta(days=max(0, min(days, 3650)))
+
+    def build(db):
+        def part(model):
+            query = (
+                select(
+                    Devices.devices_id,
+                    Devices.category,
+                    Devices.brand,
+                    Devices.model,
+                    Devices.serial_number,
+                    Devices.inventory_number,
+                    model.warranty_start_date,
+                    model.warranty_end_date,
+                    model.return_date,
+                    Divisions.division_name,
+                    Clients.firstname.label("client_first_name"),
+                    Clients.lastname.label("client_last_name"),
+                )
+                .select_from(model)
+                .join(Devices, model.devices_id == Devices.devices_id)
+                .outerjoin(Divisions, Devices.division_id == Divisions.division_id)
+                .outerjoin(Clients, Devices.client_id == Clients.client_id)
+                .filter(model.warranty_end_date <= until)
+            )
+            if not include_expired:
+                query = query.filter(model.warranty_end_date >= today)
+            return query
+
+        warranties = union_all(part(Laptops), part(Tablets)).subquery()
+        return select(warranties).order_by(warranties.c.warranty_end_date, warranties.c.devices_id)
+
+    return stream_json(request, current_user.email, build)
+
+
+@router.get("/device-age/")
+def device_age(current_user: user_dependency, group_by: str = "division", date_field: str = "delivery_date", include_bos: bool = False, db: Session = Depends(get_read_db)):
+    if group_by not in ("division", "location") or date_field not in ("delivery_date", "deployment_date"):
+        raise HTTPException(status_code=400, detail="group_by must be division or location and date_field delivery_date or deployment_date")
+
+    today = date.today()
+    age_from = getattr(Devices, date_field)
+    group_id, group_name = GROUP_COLUMNS[group_by]
+    bucket = case(
+        (age_from == None, "unknown"),
+        *[(age_from > years_ago(today, years), label) for years, label in AGE_BUCKETS],
+        else_="over_5_years",
+    ).label("bucket")
+
+    devices = (
+        db.query(group_id.label("group_id"), group_name.label("group_name"), bucket)
+        .select_from(Devices)
+        .outerjoin(Divisions, Devices.division_id == Divisions.division_id)
+        .outerjoin(Locations, Divisions.location_id == Locations.location_id)
+    )
+    if not include_bos:
+        devices = devices.filter(Devices.bos_date == None)
+    devices = devices.subquery()
+
+    # Grouped over a subquery so the CASE is not repeated (with its own parameters) in GROUP BY
+    rows = (
+        db.query(devices.c.group_id, devices.c.group_name, devices.c.bucket, func.count())
+        .group_by(devices.c.group_id, devices.c.group_name, devices.c.bucket)
+        .order_by(devices.c.group_name)
+        .all()
+    )
+
+    labels = [label for _, label in AGE_BUCKETS] + ["over_5_years", "unknown"]
+    groups = {}
+    for group_key, name, label, count in rows:
+        entry = groups.setdefault(group_key, {f"{group_by}_name": name, "total": 0, "buckets": dict.fromkeys(labels, 0)})
+        entry["buckets"][label] = count
+        entry["total"] += count
+    return list(groups.values())
+
+
+# Only devices with a repair_started_on are counted. /update-status/ sets it, and migration
+# b3f7c2e8a9d4 backfilled it from device_events, so repairs that began before device events
+# were recorded have no start date and are left out.
+@router.get("/time-in-repair/")
+def time_in_repair(current_user: user_dependency, group_by: str = "category", db: Session = Depends(get_read_db)):
+    if group_by not in GROUP_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(GROUP_COLUMNS)}")
+
+    group_id, group_name = GROUP_COLUMNS[group_by]
+    repair_days = days_between(db, Devices.repair_started_on, Devices.repaired_date)
+    open_days = days_between(db, Devices.repair_started_on, date.today())
+    completed = and_(Devices.repair_started_on != None, Devices.repaired_date >= Devices.repair_started_on)
+    in_repair = and_(Devices.status_id == 2, Devices.repair_started_on != None)
+
+    rows = (
+        db.query(
+            group_name.label("group_name"),
+            func.count(case((completed, 1))).label("repaired"),
+            func.avg(case((completed, repair_days))).label("avg_repair_days"),
+            func.max(case((completed, repair_days))).label("max_repair_days"),
+            func.count(case((in_repair, 1))).label("in_repair"),
+            func.avg(case((in_repair, open_days))).label("avg_days_in_repair"),
+        )
+        .select_from(Devices)
+        .outerjoin(Divisions, Devices.division_id == Divisions.division_id)
+        .outerjoin(Locations, Divisions.location_id == Locations.location_id)
+        .filter(Devices.repair_started_on != None)
+        .group_by(group_id, group_name)
+        .order_by(group_name)
+        .all()
+    )
+
+    key = "category" if group_by == "category" else f"{group_by}_name"
+    return [
+        {
+            key: r.group_name,
+            "repaired": r.repaired,
+            "avg_repair_days": round(float(r.avg_repair_days), 1) if r.avg_repair_days is not None else None,
+            "max_repair_days": int(r.max_repair_days) if r.max_repair_days is not None else None,
+            "in_repair": r.in_repair,
+            "avg_days_in_repair": round(float(r.avg_days_in_repair), 1) if r.avg_days_in_repair is not None else None,
+        }
+        for r in rows
+    ]
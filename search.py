@@ -0,0 +1,105 @@
+from sqlalchemy import case, func
+from models import DeviceSearch, Devices, SystemStatus, Divisions, Clients
+
+SEARCH_COLUMNS = [
+    "devices_id", "category", "brand", "model", "serial_number", "inventory_number",
+    "status_id", "division_id", "client_id", "status_description", "division_name", "client_name",
+]
+
+def normalize(value):
+    return " ".join(str(value).lower().split()) if value is not None else ""
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _search_row(row):
+    client_name = f"{row.firstname or ''} {row.lastname or ''}".strip() or None
+    searchable = [
+        row.serial_number, row.inventory_number, row.model, row.brand,
+        client_name, row.division_name, row.category,
+    ]
+    return DeviceSearch(
+        devices_id = row.devices_id,
+        category = row.category,
+        brand = row.brand,
+        model = row.model,
+        serial_number = row.serial_number,
+        inventory_number = row.inventory_number,
+        status_id = row.status_id,
+        division_id = row.division_id,
+        client_id = row.client_id,
+        status_description = row.status_description,
+        division_name = row.division_name,
+        client_name = client_name,
+        # Leading space so " term" matches the start of any word
+        search_text = " " + " ".join(normalize(value) for value in searchable if value),
+    )
+
+def _source_query(db):
+    return (
+        db.query(
+            Devices.devices_id,
+            Devices.category,
+            Devices.brand,
+            Devices.model,
+            Devices.serial_number,
+            Devices.inventory_number,
+            Devices.status_id,
+            Devices.division_id,
+            Devices.client_id,
+            SystemStatus.status_description,
+            Divisions.division_name,
+            Clients.firstname,
+            Clients.lastname,
+        )
+        .outerjoin(SystemStatus, Devices.status_id == SystemStatus.status_id)
+        .outerjoin(Divisions, Devices.division_id == Divisions.division_id)
+        .outerjoin(Clients, Devices.client_id == Clients.client_id)
+    )
+
+# Rewrites the search rows of the given devices inside the caller's transaction.
+# Devices that no longer exist simply lose their row.
+def refresh_device_search(db, devices_ids):
+    devices_ids = [devices_id for devices_id in set(devices_ids) if devices_id is not None]
+    if not devices_ids:
+        return
+    db.flush()
+    db.query(DeviceSearch).filter(DeviceSearch.devices_id.in_(devices_ids)).delete(synchronize_session=False)
+    db.add_all([_search_row(row) for row in _source_query(db).filter(Devices.devices_id.in_(devices_ids))])
+    db.flush()
+
+def remove_device_search(db, devices_id):
+    db.query(DeviceSearch).filter(DeviceSearch.devices_id == devices_id).delete(synchronize_session=False)
+
+# Used by the migration that creates the table and by the rebuild-device-search job
+def rebuild_device_search(db, batch_size=1000):
+    db.query(DeviceSearch).delete(synchronize_session=False)
+    count = 0
+    for row in _source_query(db).order_by(Devices.devices_id).yield_per(batch_size):
+        db.add(_search_row(row))
+        count += 1
+        if count % batch_size == 0:
+            db.flush()
+    return count
+
+def search_devices(db, q, limit=20):
+    terms = normalize(q).split()
+    if not terms:
+        return []
+
+    query = db.query(*[getattr(DeviceSearch, column) for column in SEARCH_COLUMNS])
+    for term in terms:
+        query = query.filter(DeviceSearch.search_text.like(f"%{_escape_like(term)}%", escape="\\"))
+
+    # Exact serial / inventory number first, then serial prefix, then word prefix, then anything else
+    first = _escape_like(terms[0])
+    rank = case(
+        (func.lower(DeviceSearch.serial_number) == terms[0], 0),
+        (func.lower(DeviceSearch.inventory_number) == terms[0], 0),
+        (func.lower(DeviceSearch.serial_number).like(f"{first}%", escape="\\"), 1),
+        (DeviceSearch.search_text.like(f"% {first}%", escape="\\"), 2),
+        else_=3,
+    )
+
+    rows = query.order_by(rank, DeviceSearch.serial_number).limit(limit).all()
+    return [dict(zip(SEARCH_COLUMNS, row)) for row in rows]
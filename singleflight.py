@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import asyncio
+import functools
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from replicas import replica_router
+from limits import LIMITS_ENABLED, route_limiters, route_class
+
+# COALESCE_TTL_SECONDS keeps a finished body for that long, so requests arriving just after it
+# also share it. 0 (the default) only shares a body with the requests that came in while it ran.
+COALESCE_TTL_SECONDS = float(os.getenv("COALESCE_TTL_SECONDS", "0"))
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "true").lower() != "false"
+
+
+class Flight:
+    def __init__(self, task):
+        self.task = task
+        self.expires_at = None
+
+
+class SingleFlight:
+    """
+    Runs a loader once per key at a time on the event loop. The first caller starts it as
+    its own task, and every caller with the same key, the first included, awaits that task,
+    so waiting costs no thread and a caller that goes away does not cancel it for the rest.
+    With a ttl the result is also handed to callers for ttl seconds afterwards.
+    """
+    def __init__(self, ttl=COALESCE_TTL_SECONDS):
+        self.ttl = ttl
+        self._flights = {}
+        self.executions = 0
+        self.shared = 0
+
+    def _sweep(self, now):
+        for key in [key for key, flight in self._flights.items() if flight.expires_at is not None and flight.expires_at < now]:
+            del self._flights[key]
+
+    def _finished(self, key, flight):
+        if self._flights.get(key) is not flight:
+            return
+        if self.ttl > 0 and not flight.task.cancelled() and flight.task.exception() is None:
+            flight.expires_at = time.monotonic() + self.ttl
+        else:
+            del self._flights[key]
+
+    async def do(self, key, loader):
+        self._sweep(time.monotonic())
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = Flight(asyncio.ensure_future(loader()))
+            flight.task.add_done_callback(lambda task: self._finished(key, flight))
+            self.executions += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(flight.task)
+
+    def stats(self):
+        return {"executions": self.executions, "shared": self.shared, "in_flight": sum(not flight.task.done() for flight in self._flights.values())}
+
+
+single_flight = SingleFlight()
+
+
+# THIS IS THE SECTION THAT DEFINES THE ENDPOINT DECORATOR ####################################################
+# Requests only share a body when they have the same route, the same parameters and the same
+# auth scope (anonymous, or the user's role). A user who wrote within REPLICA_STICKY_SECONDS
+# is not coalesced, since the shared read may have started before their write.
+
+def auth_scope(user):
+    if user is None:
+        return "anonymous"
+    if replica_router.is_sticky(user.email):
+        return None
+    return f"role:{user.role_id}"
+
+# The coalesced endpoints take their lists as sets of filter values, so order and
+# duplicates do not matter and an empty list is the same as no list
+def _normalize(value):
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return sorted(set(map(str, value))) or None
+    return value
+
+def flight_key(route, params, scope):
+    return f"{route}:{json.dumps(_normalize(jsonable_encoder(params)), sort_keys=True)}:{scope}"
+
+def coalesced(endpoint):
+    """
+    Wraps a sync read endpoint so identical concurrent requests share one execution of it,
+    and the JSON encoding of its result. The endpoint's db session and current_user
+    parameters are not part of the key. The route limiter leaves coalesced endpoints to
+    this wrapper, which only takes a slot for the request that runs the endpoint; the
+    requests waiting on it hold neither a slot nor a thread.
+    """
+    limiter = route_limiters[route_class(endpoint.__module__)]
+
+    async def run(args, kwargs):
+        if LIMITS_ENABLED:
+            await limiter.acquire()
+        try:
+            return await run_in_threadpool(lambda: JSONResponse(jsonable_encoder(endpoint(*args, **kwargs))).body)
+        finally:
+            if LIMITS_ENABLED:
+                limiter.release()
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        scope = auth_scope(kwargs.get("current_user"))
+        if not COALESCE_ENABLED or scope is None:
+            body = await run(args, kwargs)
+        else:
+            params = {name: value for name, value in kwargs.items() if name not in ("db", "current_user")}
+            body = await single_flight.do(flight_key(endpoint.__name__, params, scope), lambda: run(args, kwargs))
+        return Response(content=body, media_type="application/json")
+
+    wrapper.coalesced = True
+    return wrapper
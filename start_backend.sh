@@ -14,4 +14,5 @@ echo "Running migrations..."
 alembic upgrade head
 
 echo "Starting backend..."
-exec gunicorn main:app -w 2 -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000 --timeout 60
\ No newline at end of file
+python launcher.py show
+exec gunicorn main:app -c python:launcher
\ No newline at end of file
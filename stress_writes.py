@@ -0,0 +1,130 @@
+"""
+Concurrency stress test for the versioned device writes, run against a live server:
+
+    python stress_writes.py --token <access token> --devices 100 --levels 1,10,50,100
+
+Every writer reads its device, then flips its status with /update-status/ sending the
+row_version it read. In the default "distinct" mode writer i writes device i % --devices, so
+writers only contend where they share a device; "--mode same" puts every writer on one
+device to measure the worst case. Missing STRESS-<n> devices are created first.
+
+Each accepted write bumps its device's row_version by exactly one, so the versions must grow
+by exactly the number of 201 responses; anything else is a lost (or double counted)
+update. Throughput is printed for every level, so a collapse as writers are added shows
+up next to the single writer baseline.
+"""
+import sys
+import json
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import quote
+
+
+class Client:
+    def __init__(self, host, port, token):
+        self.host = host
+        self.port = port
+        self.headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+
+    def request(self, method, path, body=None, retry=True):
+        try:
+            self.conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=self.headers)
+            response = self.conn.getresponse()
+            return response.status, json.loads(response.read() or b"null")
+        except (OSError, http.client.HTTPException):
+            # The server may have closed an idle keep-alive connection; retry once on a fresh one
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            return self.request(method, path, body, retry=False) if retry else (None, None)
+
+    def read_device(self, serial):
+        status, items = self.request("GET", f"/get-items/?filter={quote('Serial Number')}&input={quote(serial)}")
+        if status != 200:
+            return None
+        return next((item for item in items if item["serial_number"] == serial), None)
+
+
+def serial_for(index):
+    return f"STRESS-{index:04d}"
+
+def ensure_devices(client, args):
+    for index in range(args.devices):
+        if client.read_device(serial_for(index)) is None:
+            status, body = client.request("POST", "/add-device/", {
+                "category": "Stress", "model": serial_for(index), "serial_number": serial_for(index),
+                "status_id": args.statuses[0], "division_id": args.division,
+            })
+            if status != 200:
+                sys.exit(f"Could not create {serial_for(index)}: {status} {body}")
+
+def total_version(client, serials):
+    return sum(client.read_device(serial)["row_version"] for serial in serials)
+
+def run_writers(args, writers, serials):
+    counts = {"ok": 0, "conflict": 0, "stale": 0, "error": 0}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + args.duration
+    statuses = args.statuses
+
+    def writer(serial):
+        client = Client(args.host, args.port, args.token)
+        while time.monotonic() < stop_at:
+            device = client.read_device(serial)
+            if device is None:
+                outcome = "error"
+            else:
+                new_status = statuses[1] if device["status_id"] == statuses[0] else statuses[0]
+                status, _ = client.request("POST", "/update-status/", {
+                    "serial_number": serial, "new_status": new_status, "row_version": device["row_version"],
+                })
+                outcome = {201: "ok", 409: "conflict", 404: "stale"}.get(status, "error")
+            with lock:
+                counts[outcome] += 1
+
+    threads = [threading.Thread(target=writer, args=(serials[index % len(serials)],)) for index in range(writers)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    return counts, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stress concurrent status updates.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--mode", choices=["distinct", "same"], default="distinct")
+    parser.add_argument("--devices", type=int, default=100, help="number of STRESS-<n> devices to spread the writers over")
+    parser.add_argument("--levels", default="1,10,50,100", help="writer counts to run, one after the other")
+    parser.add_argument("--statuses", default="1,2", help="the two status ids to flip between")
+    parser.add_argument("--division", type=int, default=1, help="division id for created devices")
+    parser.add_argument("--duration", type=int, default=10, help="seconds per level")
+    args = parser.parse_args()
+    args.statuses = [int(value) for value in args.statuses.split(",")]
+
+    reader = Client(args.host, args.port, args.token)
+    ensure_devices(reader, args)
+    serials = [serial_for(0)] if args.mode == "same" else [serial_for(index) for index in range(args.devices)]
+    start_version = total_version(reader, serials)
+
+    accepted = 0
+    for writers in [int(value) for value in args.levels.split(",")]:
+        counts, elapsed = run_writers(args, writers, serials)
+        accepted += counts["ok"]
+        attempts = sum(counts.values())
+        print(
+            f"{args.mode} {writers:4d} writers on {min(writers, len(serials)):4d} devices: "
+            f"{attempts / elapsed:8.1f} attempts/s  {counts['ok'] / elapsed:8.1f} writes/s  "
+            f"ok={counts['ok']} conflict={counts['conflict']} stale={counts['stale']} error={counts['error']}"
+        )
+
+    end_version = total_version(reader, serials)
+    lost = (end_version - start_version) - accepted
+    print(f"versions {start_version} -> {end_version}, accepted writes {accepted}, lost updates {lost}")
+    sys.exit(0 if lost == 0 else 1)
@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+
+# The app reads its settings at import time, so they are set before anything is imported.
+# Every test session runs against a fresh SQLite file.
+_db_dir = tempfile.mkdtemp()
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_db_dir}/inventory.db",
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "ORGIN": "http://localhost",
+    "DEFAULT_USERNAME": "admin@test",
+    "DEFAULT_PASSWORD": "password",
+    "CACHE_BACKEND": "memory",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+import models
+
+
+@pytest.fixture(scope="session")
+def client():
+    models.Base.metadata.create_all(models.engine)
+    import main
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def headers(client):
+    token = client.post("/token", data={"username": "admin@test", "password": "password"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def reference_data(client, headers):
+    client.post("/add-status/", json={"status": "Active"}, headers=headers)
+    client.post("/add-status/", json={"status": "Repair"}, headers=headers)
+    client.post("/add-division/", json={"division": "ICT"}, headers=headers)
+    client.post("/create-client/", json={"firstname": "A", "lastname": "B", "email": "a@test", "phone_number": "1", "position": "p", "division_id": 1}, headers=headers)
@@ -0,0 +1,32 @@
+from cache import cache
+from models import SessionLocal
+from dependencies import get_cached_user, CACHED_USER_FIELDS
+
+
+def test_cached_user_leaves_out_the_password_hash(client):
+    db = SessionLocal()
+    try:
+        user = get_cached_user(db, "admin@test")
+    finally:
+        db.close()
+
+    assert user.email == "admin@test"
+    assert user.password is None
+    record = cache.get("auth-user:admin@test", tags=("users",))
+    assert set(record) == set(CACHED_USER_FIELDS)
+
+
+def test_password_change_still_checks_the_stored_hash(client, headers):
+    wrong = client.post("/change-password/", json={"old_password": "wrong", "new_password": "x"}, headers=headers)
+    assert wrong.status_code == 400
+    changed = client.post("/change-password/", json={"old_password": "password", "new_password": "password"}, headers=headers)
+    assert changed.status_code == 200
+
+
+def test_users_me_returns_the_user_without_a_password(client, headers):
+    response = client.get("/users/me/", headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["email"] == "admin@test"
+    assert body["role_id"] == 1
+    assert "password" not in body
@@ -0,0 +1,53 @@
+def add_laptop(client, headers, serial_number):
+    response = client.post("/add-laptop/", json={
+        "category": "Laptop", "model": f"model-{serial_number}", "serial_number": serial_number,
+        "status_id": 1, "division_id": 1, "cpu_type_id": 1,
+    }, headers=headers)
+    assert response.status_code == 200
+
+
+def test_batch_runs_sync_and_async_handlers(client, headers, reference_data):
+    add_laptop(client, headers, "BAT1")
+    response = client.post("/batch/", json={"mode": "atomic", "operations": [
+        {"op": "create-client", "params": {"firstname": "C", "lastname": "D", "email": "c@test", "phone_number": "2", "position": "p", "division_id": 1}},
+        {"op": "update-status", "params": {"serial_number": "BAT1", "new_status": 2}},
+    ]}, headers=headers).json()
+
+    assert response["committed"] is True
+    assert [result["status"] for result in response["results"]] == [200, 200]
+    assert client.get("/get-item-sn/?serial_number=BAT1&category=Laptop").json()["status_id"] == 2
+
+
+def test_atomic_batch_rolls_back_on_failure(client, headers, reference_data):
+    add_laptop(client, headers, "BAT2")
+    response = client.post("/batch/", json={"mode": "atomic", "operations": [
+        {"op": "update-status", "params": {"serial_number": "BAT2", "new_status": 2}},
+        {"op": "update-status", "params": {"serial_number": "MISSING", "new_status": 2}},
+    ]}, headers=headers).json()
+
+    assert response["committed"] is False
+    assert [result["status"] for result in response["results"]] == [200, 404]
+    assert client.get("/get-item-sn/?serial_number=BAT2&category=Laptop").json()["status_id"] == 1
+
+
+def test_batch_invalidates_only_committed_devices_after_commit(client, headers, reference_data, monkeypatch):
+    import cache
+    add_laptop(client, headers, "BAT3")
+    add_laptop(client, headers, "BAT4")
+    invalidated = []
+    monkeypatch.setattr(cache.device_detail_cache, "invalidate", lambda *tags: invalidated.extend(tags))
+
+    response = client.post("/batch/", json={"mode": "independent", "operations": [
+        {"op": "update-status", "params": {"serial_number": "BAT3", "new_status": 2}},
+        {"op": "update-status", "params": {"serial_number": "BAT4", "new_status": 99}},
+    ]}, headers=headers).json()
+    assert [result["status"] for result in response["results"]] == [200, 404]
+    assert invalidated == ["device:BAT3"]
+
+    invalidated.clear()
+    response = client.post("/batch/", json={"mode": "atomic", "operations": [
+        {"op": "update-status", "params": {"serial_number": "BAT4", "new_status": 2}},
+        {"op": "update-status", "params": {"serial_number": "MISSING", "new_status": 2}},
+    ]}, headers=headers).json()
+    assert response["committed"] is False
+    assert invalidated == []
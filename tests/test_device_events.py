@@ -0,0 +1,59 @@
+from models import SessionLocal, Devices, DeviceEvents
+from device_events import record_device_event
+
+
+def events_for(serial_number):
+    db = SessionLocal()
+    try:
+        return [row.action for row in db.query(DeviceEvents).filter(DeviceEvents.serial_number == serial_number).order_by(DeviceEvents.seq)]
+    finally:
+        db.close()
+
+
+def test_events_are_inserted_at_commit(client, reference_data):
+    db = SessionLocal()
+    try:
+        device = Devices(category="Monitor", serial_number="EVT1", status_id=1, division_id=1)
+        db.add(device)
+        db.flush()
+        record_device_event(db, device, "added", "tester")
+        db.flush()
+        assert db.query(DeviceEvents).filter(DeviceEvents.serial_number == "EVT1").count() == 0
+        db.commit()
+    finally:
+        db.close()
+    assert events_for("EVT1") == ["added"]
+
+
+def test_savepoint_rollback_drops_only_its_events(client, reference_data):
+    db = SessionLocal()
+    try:
+        device = Devices(category="Monitor", serial_number="EVT2", status_id=1, division_id=1)
+        db.add(device)
+        db.flush()
+        record_device_event(db, device, "added", "tester")
+
+        kept = db.begin_nested()
+        record_device_event(db, device, "assigned", "tester")
+        kept.commit()
+
+        dropped = db.begin_nested()
+        record_device_event(db, device, "unassigned", "tester")
+        dropped.rollback()
+
+        db.commit()
+    finally:
+        db.close()
+    assert events_for("EVT2") == ["added", "assigned"]
+
+
+def test_rollback_drops_queued_events(client, reference_data):
+    db = SessionLocal()
+    try:
+        device = db.query(Devices).filter(Devices.serial_number == "EVT1").one()
+        record_device_event(db, device, "updated", "tester")
+        db.rollback()
+        db.commit()
+    finally:
+        db.close()
+    assert events_for("EVT1") == ["added"]
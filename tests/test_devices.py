@@ -0,0 +1,85 @@
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+
+
+def test_tablet_detail_round_trips_its_version(client, headers, reference_data):
+    response = client.post("/add-tablet/", json={
+        "category": "Tablet", "model": "iPad", "serial_number": "TAB1", "status_id": 1,
+        "division_id": 1, "operating_system": "iPadOS", "version": "iOS 17",
+    }, headers=headers)
+    assert response.status_code == 200
+
+    item = client.get("/get-item-sn/?serial_number=TAB1&category=Tablet").json()
+    assert item["version"] == "iOS 17"
+    assert item["row_version"] == 1
+
+    response = client.put(f"/assign-device/?device_sn=TAB1&client_id=1&row_version={item['row_version']}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["row_version"] == 2
+
+    item = client.get("/get-item-sn/?serial_number=TAB1&category=Tablet").json()
+    assert item["row_version"] == 2
+    assert item["version"] == "iOS 17"
+
+    stale = client.put("/assign-device/?device_sn=TAB1&client_id=1&row_version=1", headers=headers)
+    assert stale.status_code == 409
+
+
+def add_laptop(client, headers, serial_number):
+    response = client.post("/add-laptop/", json={
+        "category": "Laptop", "model": f"model-{serial_number}", "serial_number": serial_number,
+        "status_id": 1, "division_id": 1, "cpu_type_id": 1,
+    }, headers=headers)
+    assert response.status_code == 200
+
+def read_laptop(client, serial_number):
+    return client.get(f"/get-item-sn/?serial_number={serial_number}&category=Laptop").json()
+
+
+def test_stale_row_version_on_update_status_is_a_conflict(client, headers, reference_data):
+    add_laptop(client, headers, "VER1")
+    row_version = read_laptop(client, "VER1")["row_version"]
+
+    response = client.post("/update-status/", json={"serial_number": "VER1", "new_status": 2, "row_version": row_version}, headers=headers)
+    assert response.status_code == 201
+    assert response.json()["row_version"] == row_version + 1
+
+    stale = client.post("/update-status/", json={"serial_number": "VER1", "new_status": 1, "row_version": row_version}, headers=headers)
+    assert stale.status_code == 409
+
+    item = read_laptop(client, "VER1")
+    assert item["status_id"] == 2
+    assert item["row_version"] == row_version + 1
+
+
+def test_concurrent_writers_to_one_device_lose_no_updates(client, headers, reference_data):
+    add_laptop(client, headers, "VER2")
+    start = read_laptop(client, "VER2")["row_version"]
+
+    # Every writer flips the status it read, sending the row_version it read, so each
+    # accepted write must bump row_version by exactly one
+    def writer(_):
+        statuses = []
+        for _ in range(5):
+            device = read_laptop(client, "VER2")
+            statuses.append(client.post("/update-status/", json={
+                "serial_number": "VER2", "new_status": 1 if device["status_id"] == 2 else 2, "row_version": device["row_version"],
+            }, headers=headers).status_code)
+        return statuses
+
+    with ThreadPoolExecutor(8) as pool:
+        statuses = [status for result in pool.map(writer, range(8)) for status in result]
+
+    assert set(statuses) <= {201, 409}
+    assert statuses.count(201) >= 1
+    assert read_laptop(client, "VER2")["row_version"] == start + statuses.count(201)
+
+
+def test_assign_and_repair_dates_are_stored_as_dates(client, headers, reference_data):
+    add_laptop(client, headers, "DAT1")
+    assert client.put("/assign-device/?device_sn=DAT1&client_id=1", headers=headers).status_code == 200
+    assert client.post("/update-status/", json={"serial_number": "DAT1", "new_status": 2}, headers=headers).status_code == 201
+
+    device = client.post("/update-status/", json={"serial_number": "DAT1", "new_status": 1}, headers=headers).json()
+    assert device["assigned_on"] == date.today().isoformat()
+    assert device["repaired_date"] == date.today().isoformat()
@@ -0,0 +1,36 @@
+import threading
+from sqlalchemy import event
+import models
+from hierarchy import hierarchy_tree
+
+
+def count_statements(run):
+    # Only this thread's, the app's job runner polls the same engine
+    statements = []
+    thread = threading.get_ident()
+    def listener(conn, cursor, statement, *args):
+        if threading.get_ident() == thread:
+            statements.append(statement)
+    event.listen(models.engine, "before_cursor_execute", listener)
+    try:
+        result = run()
+    finally:
+        event.remove(models.engine, "before_cursor_execute", listener)
+    return result, statements
+
+
+def test_the_tree_is_served_without_queries_until_a_device_is_written(client, headers, reference_data):
+    before = hierarchy_tree.tree()["device_count"]
+
+    tree, statements = count_statements(hierarchy_tree.tree)
+    assert statements == []
+    assert tree["device_count"] == before
+
+    response = client.post("/add-laptop/", json={
+        "category": "Laptop", "model": "model-HIER1", "serial_number": "HIER1", "status_id": 1, "division_id": 1, "cpu_type_id": 1,
+    }, headers=headers)
+    assert response.status_code == 200
+
+    tree, statements = count_statements(hierarchy_tree.tree)
+    assert statements
+    assert tree["device_count"] == before + 1
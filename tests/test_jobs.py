@@ -0,0 +1,80 @@
+import uuid
+from datetime import datetime, timedelta
+from models import SessionLocal, Jobs
+from jobs import import_devices_job, JobRunner, RUNNING, QUEUED, FINISHED, FAILED
+
+
+def test_import_job_records_events_and_invalidates_caches(client, headers, reference_data):
+    since = client.get("/changes/", headers=headers).json()
+    while since["has_more"]:
+        since = client.get(f"/changes/?since={since['last_seq']}", headers=headers).json()
+    before = client.get("/hierarchy/", headers=headers).json()["device_count"]
+    # Caches the miss for the serial about to be imported
+    assert client.get("/get-item-sn/?serial_number=IMP1&category=Monitor").json() == {"message": "Device not found"}
+
+    import_devices_job({"devices": [
+        {"category": "Monitor", "model": "p1", "serial_number": "IMP1", "status_id": 1, "division_id": 1},
+        {"category": "Monitor", "model": "p2", "serial_number": "IMP2", "status_id": 1, "division_id": 1},
+    ]}, "importer")
+
+    changes = client.get(f"/changes/?since={since['last_seq']}", headers=headers).json()["events"]
+    assert [(event["serial_number"], event["action"]) for event in changes] == [("IMP1", "added"), ("IMP2", "added")]
+    assert client.get("/hierarchy/", headers=headers).json()["device_count"] == before + 2
+    assert client.get("/get-item-sn/?serial_number=IMP1&category=Monitor").json()["serial_number"] == "IMP1"
+
+
+def add_job(**columns):
+    db = SessionLocal()
+    try:
+        columns.setdefault("created_at", datetime.now())
+        job = Jobs(job_id=str(uuid.uuid4()), kind="location-summary", params="{}", **columns)
+        db.add(job)
+        db.commit()
+        return job.job_id
+    finally:
+        db.close()
+
+def load_job(job_id):
+    db = SessionLocal()
+    try:
+        return db.query(Jobs).filter(Jobs.job_id == job_id).first()
+    finally:
+        db.close()
+
+def make_stale(job_id):
+    db = SessionLocal()
+    try:
+        # Stale for this runner, but not for the app's own runner (JOB_STALE_SECONDS=120)
+        db.query(Jobs).filter(Jobs.job_id == job_id).update({Jobs.heartbeat_at: datetime.now() - timedelta(seconds=90)})
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_a_stale_job_is_requeued_until_it_runs_out_of_attempts(client):
+    runner = JobRunner(stale_seconds=60, max_attempts=2)
+    job_id = add_job(status=RUNNING, attempts=1)
+    make_stale(job_id)
+
+    assert runner._claim_next() == job_id
+    assert load_job(job_id).attempts == 2
+
+    make_stale(job_id)
+    assert runner._claim_next() is None
+    job = load_job(job_id)
+    assert job.status == FAILED
+    assert job.attempts == 2
+    assert "Abandoned" in job.error
+
+
+def test_prune_deletes_only_old_finished_jobs(client):
+    runner = JobRunner(retention_days=7)
+    old = add_job(status=FINISHED, result="x" * 1000, finished_at=datetime.now() - timedelta(days=8))
+    old_failed = add_job(status=FAILED, finished_at=datetime.now() - timedelta(days=8))
+    recent = add_job(status=FINISHED, finished_at=datetime.now() - timedelta(days=1))
+    queued = add_job(status=QUEUED, created_at=datetime.now() - timedelta(days=30))
+
+    assert runner.prune() >= 2
+    assert load_job(old) is None and load_job(old_failed) is None
+    assert load_job(recent) is not None
+    assert load_job(queued) is not None
@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+import asyncio
+import subprocess
+import models
+from cache import FileStore
+from replicas import ReplicaRouter
+
+
+def test_a_write_on_one_worker_is_sticky_on_another(tmp_path):
+    store = FileStore(str(tmp_path / "cache.sqlite3"))
+    writer = ReplicaRouter([], sticky_seconds=0.5, store=store)
+    reader = ReplicaRouter([], sticky_seconds=0.5, store=FileStore(str(tmp_path / "cache.sqlite3")))
+
+    assert not reader.is_sticky("user@test")
+    writer.mark_write("user@test")
+    assert reader.is_sticky("user@test")
+    assert not reader.is_sticky("other@test")
+
+    time.sleep(0.6)
+    assert not reader.is_sticky("user@test")
+
+
+def test_a_write_in_another_process_is_sticky(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    reader = ReplicaRouter([], sticky_seconds=5, store=FileStore(path))
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", (
+        "from cache import FileStore; from replicas import ReplicaRouter; "
+        f"ReplicaRouter([], sticky_seconds=5, store=FileStore({path!r})).mark_write('user@test')"
+    )], cwd=root, env=os.environ, check=True)
+
+    assert reader.is_sticky("user@test")
+
+
+def test_without_a_shared_tier_only_the_writing_worker_is_sticky():
+    writer = ReplicaRouter([], sticky_seconds=5)
+    reader = ReplicaRouter([], sticky_seconds=5)
+    writer.mark_write("user@test")
+    assert writer.is_sticky("user@test")
+    assert not reader.is_sticky("user@test")
+
+
+def replica_urls(tmp_path, *names):
+    return [f"sqlite:///{tmp_path / name}.db" for name in names]
+
+def session_url(session):
+    return str(session.get_bind().url)
+
+
+def test_reads_go_round_robin_over_the_replicas(tmp_path):
+    urls = replica_urls(tmp_path, "one", "two")
+    router = ReplicaRouter(urls)
+    assert [session_url(router.read_session()) for _ in range(4)] == urls * 2
+
+
+def test_unhealthy_replicas_are_skipped_and_the_primary_is_the_fallback(tmp_path):
+    # A file under a directory that does not exist cannot be opened, like a replica that is down
+    down = f"sqlite:///{tmp_path / 'missing' / 'down.db'}"
+    up, = replica_urls(tmp_path, "up")
+    router = ReplicaRouter([down, up])
+    router.check_health()
+
+    assert [replica.healthy for replica in router.replicas] == [False, True]
+    assert {session_url(router.read_session()) for _ in range(4)} == {up}
+
+    router.replicas[1].healthy = False
+    assert session_url(router.read_session()) == str(models.engine.url)
+
+
+def test_health_checks_run_in_the_background(tmp_path):
+    router = ReplicaRouter([f"sqlite:///{tmp_path / 'missing' / 'down.db'}"])
+
+    async def run():
+        await router.start()
+        await asyncio.sleep(0.2)
+        await router.stop()
+    asyncio.run(run())
+
+    assert not router.replicas[0].healthy
+    assert session_url(router.read_session()) == str(models.engine.url)
+
+
+def test_a_sticky_user_reads_from_the_primary(tmp_path):
+    router = ReplicaRouter(replica_urls(tmp_path, "one"), sticky_seconds=5)
+    router.mark_write("user@test")
+    assert session_url(router.read_session("user@test")) == str(models.engine.url)
+    assert session_url(router.read_session("other@test")) != str(models.engine.url)
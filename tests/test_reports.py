@@ -0,0 +1,23 @@
+from limits import route_limiters
+from replicas import replica_router
+
+
+def test_a_streamed_report_keeps_its_slot_and_timeout_until_the_stream_ends(client, headers, monkeypatch):
+    limiter = route_limiters["reports"]
+    sessions, active = [], []
+    read_session = replica_router.read_session
+
+    # The stream opens its session once the endpoint has returned
+    def recording_read_session(user_key=None):
+        active.append(limiter.active)
+        sessions.append(read_session(user_key))
+        return sessions[-1]
+    monkeypatch.setattr(replica_router, "read_session", recording_read_session)
+
+    response = client.get("/warranties-expiring/", headers=headers)
+    assert response.status_code == 200
+    assert isinstance(response.json(), list)
+
+    assert active == [1]
+    assert sessions[0].info["statement_timeout"] == limiter.statement_timeout
+    assert limiter.active == 0
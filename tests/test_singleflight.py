@@ -0,0 +1,62 @@
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import routers.reports
+from limits import route_limiters
+from singleflight import SingleFlight, single_flight
+
+
+def test_concurrent_callers_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return b"body"
+
+    async def main():
+        return await asyncio.gather(*[flights.do("key", load) for _ in range(20)])
+
+    assert asyncio.run(main()) == [b"body"] * 20
+    assert len(calls) == 1
+    assert flights.stats() == {"executions": 1, "shared": 19, "in_flight": 0}
+
+
+def test_cancelled_leader_does_not_fail_followers():
+    flights = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.05)
+        return b"body"
+
+    async def main():
+        leader = asyncio.ensure_future(flights.do("key", load))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do("key", load))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == b"body"
+
+
+def test_identical_reads_are_coalesced_before_the_limiter(client, monkeypatch):
+    limiter = route_limiters["reports"]
+    monkeypatch.setattr(limiter, "queue", 0)
+    monkeypatch.setattr(limiter, "_slots", asyncio.Semaphore(1))
+    rejected = limiter.rejected
+
+    def slow_snapshot(*args):
+        time.sleep(0.3)
+        return None
+    monkeypatch.setattr(routers.reports, "current_snapshot", slow_snapshot)
+
+    executions = single_flight.executions
+    with ThreadPoolExecutor(10) as pool:
+        statuses = list(pool.map(lambda _: client.get("/get-all-locations/").status_code, range(10)))
+
+    assert statuses == [200] * 10
+    assert limiter.rejected == rejected
+    assert single_flight.executions - executions < 10
+    assert limiter.active == 0